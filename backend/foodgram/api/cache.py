@@ -0,0 +1,174 @@
+from hashlib import md5
+from uuid import uuid4
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from recipes.models import AmountIngredient, Recipe, ShoppingCart
+
+from .metrics import registry
+from .models import ReferenceVersion
+
+SHOPPING_CART_TIMEOUT = 60 * 60 * 24
+CART_VERSION_KEY = 'shopping_cart:{user_id}:version'
+CART_INGREDIENTS_KEY = 'shopping_cart:{user_id}:{version}'
+CART_DOCUMENT_KEY = 'shopping_cart:{user_id}:{version}:{format}'
+REFERENCE_TIMEOUT = 60 * 60 * 24
+REFERENCE_VERSION_TIMEOUT = 10
+REFERENCE_VERSION_KEY = 'reference:{label}:version'
+REFERENCE_RESPONSE_KEY = 'reference:{label}:{version}:{path}'
+FEED_TIMEOUT = 60 * 60 * 24
+FEED_TIMELINE_KEY = 'feed:{user_id}:timeline'
+FEED_TIMELINE_SIZE = 1000
+
+
+def is_shared_cache():
+    """Кеш общий для всех процессов (не локальный в памяти)"""
+    return not isinstance(caches['default'], LocMemCache)
+
+
+def get_cart_version(user_id):
+    """Текущая версия корзины пользователя. Новая версия появляется
+    после invalidate_cart, старые ключи просто истекают."""
+    return cache.get_or_set(
+        CART_VERSION_KEY.format(user_id=user_id),
+        lambda: uuid4().hex, SHOPPING_CART_TIMEOUT)
+
+
+def invalidate_cart(*user_ids):
+    cache.delete_many([
+        CART_VERSION_KEY.format(user_id=user_id) for user_id in user_ids])
+
+
+def invalidate_recipe_carts(recipe_id):
+    """Сброс корзин всех пользователей, у которых есть рецепт"""
+    invalidate_cart(*ShoppingCart.objects.filter(
+        recipe_id=recipe_id).values_list('user_id', flat=True))
+
+
+def invalidate_ingredient_carts(ingredient_id):
+    """Сброс корзин, в рецептах которых есть ингредиент: в кеше корзины
+    хранятся его название и единица измерения"""
+    invalidate_cart(*ShoppingCart.objects.filter(
+        recipe__amount_recipe__ingredient_id=ingredient_id
+    ).values_list('user_id', flat=True).distinct())
+
+
+def get_cart_ingredients(user, version=None):
+    """Суммированные ингредиенты корзины:
+    список (название, количество, единица измерения)."""
+    if version is None:
+        version = get_cart_version(user.pk)
+    key = CART_INGREDIENTS_KEY.format(user_id=user.pk, version=version)
+    ingredients = cache.get(key)
+    registry.cache_lookup('shopping_cart', ingredients is not None)
+    if ingredients is None:
+        ingredients = list(
+            AmountIngredient.objects
+            .filter(recipe__recipe_in_cart__user=user)
+            .values('ingredient')
+            .annotate(total=Sum('amount'))
+            .values_list(
+                'ingredient__name', 'total', 'ingredient__measurement_unit')
+            .order_by('ingredient__name')
+        )
+        cache.set(key, ingredients, SHOPPING_CART_TIMEOUT)
+    return ingredients
+
+
+def get_cart_stream(user, renderer):
+    """Поток документа со списком покупок. Документы рендереров с
+    cache_document кешируются целиком до изменения корзины."""
+    version = get_cart_version(user.pk)
+    if not renderer.cache_document:
+        return renderer.stream(user, get_cart_ingredients(user, version))
+    key = CART_DOCUMENT_KEY.format(
+        user_id=user.pk, version=version, format=renderer.format)
+    document = cache.get(key)
+    registry.cache_lookup('shopping_cart_document', document is not None)
+    if document is None:
+        document = b''.join(renderer.stream(
+            user, get_cart_ingredients(user, version)))
+        cache.set(key, document, SHOPPING_CART_TIMEOUT)
+    return iter((document,))
+
+
+def get_reference_version(model):
+    """Версия справочника: (токен, время последнего изменения).
+    Читается из ReferenceVersion и кешируется на REFERENCE_VERSION_TIMEOUT
+    секунд: изменения из других процессов видны не позже этого срока."""
+    label = model._meta.label_lower
+
+    def load():
+        row, _ = ReferenceVersion.objects.get_or_create(label=label)
+        changed = row.changed.timestamp()
+        return f'{row.version}.{int(changed * 1000)}', int(changed)
+
+    return cache.get_or_set(
+        REFERENCE_VERSION_KEY.format(label=label), load,
+        REFERENCE_VERSION_TIMEOUT)
+
+
+def invalidate_reference(model):
+    label = model._meta.label_lower
+    ReferenceVersion.objects.get_or_create(label=label)
+    ReferenceVersion.objects.filter(label=label).update(
+        version=F('version') + 1, changed=timezone.now())
+    cache.delete(REFERENCE_VERSION_KEY.format(label=label))
+
+
+def get_reference_etag(version, path):
+    return f'"{version}-{md5(path.encode()).hexdigest()}"'
+
+
+def get_reference_response_key(model, version, path):
+    return REFERENCE_RESPONSE_KEY.format(
+        label=model._meta.label_lower, version=version,
+        path=md5(path.encode()).hexdigest())
+
+
+def get_feed_timeline(user):
+    """Материализованная лента подписок: до FEED_TIMELINE_SIZE последних
+    записей (pub_date, id), от новых к старым.
+
+    При каждом чтении лента дополняется рецептами новее первой записи,
+    это один запрос по индексу. complete=False значит, что в ленту
+    попали не все рецепты и более старые нужно брать из базы."""
+    key = FEED_TIMELINE_KEY.format(user_id=user.pk)
+    timeline = cache.get(key)
+    registry.cache_lookup('feed', timeline is not None)
+    recipes = Recipe.objects.filter(
+        author__following__user=user).order_by('-pub_date', '-id')
+    if timeline is None:
+        entries = list(recipes.values_list(
+            'pub_date', 'id')[:FEED_TIMELINE_SIZE + 1])
+        timeline = {
+            'entries': entries[:FEED_TIMELINE_SIZE],
+            'complete': len(entries) <= FEED_TIMELINE_SIZE,
+        }
+    else:
+        entries = timeline['entries']
+        if entries:
+            recipes = recipes.filter(pub_date__gte=entries[0][0])
+        known = {pk for _, pk in entries}
+        fresh = [
+            entry for entry in recipes.values_list(
+                'pub_date', 'id')[:FEED_TIMELINE_SIZE]
+            if entry[1] not in known
+        ]
+        if not fresh:
+            return timeline
+        entries = fresh + entries
+        timeline = {
+            'entries': entries[:FEED_TIMELINE_SIZE],
+            'complete': (timeline['complete']
+                         and len(entries) <= FEED_TIMELINE_SIZE),
+        }
+    cache.set(key, timeline, FEED_TIMEOUT)
+    return timeline
+
+
+def invalidate_feed(user_id):
+    cache.delete(FEED_TIMELINE_KEY.format(user_id=user_id))
@@ -1,24 +1,40 @@
-import base64
 import uuid
 
-from django.core.files.base import ContentFile
 from rest_framework import serializers
 
+from .images import (DETAIL, THUMBNAIL, ImageDecodeError,
+                     decode_base64_image, variant_url)
+
 
 class Base64ImageField(serializers.Field):
     """Кастомное поле для преобразования формата Base64"""
-    def to_internal_value(self, data):
-        if isinstance(data, str) and data.startswith('data:image'):
-            format, imgstr = data.split(';base64,')
-            ext = format.split('/')[-1]
 
-            file_name = f'{uuid.uuid4().hex}.{ext}'
+    def __init__(self, variant=None, **kwargs):
+        self.variant = variant
+        super().__init__(**kwargs)
 
-            decoded_image = base64.b64decode(imgstr)
-            return ContentFile(decoded_image, name=file_name)
+    def to_internal_value(self, data):
+        if isinstance(data, str) and data.startswith('data:image'):
+            try:
+                return decode_base64_image(data, uuid.uuid4().hex)
+            except ImageDecodeError as error:
+                raise serializers.ValidationError(str(error))
         return super().to_internal_value(data)
 
+    def get_variant(self):
+        return self.variant
+
     def to_representation(self, value):
         if value and hasattr(value, 'url'):
-            return value.url
+            return variant_url(value, self.get_variant())
         return value
+
+
+class RecipeImageField(Base64ImageField):
+    """Картинка рецепта: миниатюра в списке, крупная копия в карточке"""
+
+    def get_variant(self):
+        view = self.context.get('view')
+        if view is not None and view.action in ('list', 'feed'):
+            return THUMBNAIL
+        return DETAIL
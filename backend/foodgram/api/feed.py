@@ -0,0 +1,34 @@
+from django.utils.dateparse import parse_datetime
+
+from users.custom_fields import get_subscriptions
+
+from .cache import get_feed_timeline
+
+FEED_FANOUT_THRESHOLD = 100
+
+
+def get_feed_queryset(request, queryset, paginator):
+    """Рецепты авторов, на которых подписан пользователь.
+
+    При небольшом числе подписок это один JOIN с Follow по индексу
+    (author, pub_date). При FEED_FANOUT_THRESHOLD и более подписок
+    страница берётся из материализованной ленты get_feed_timeline, а к
+    JOIN возвращаемся, только если курсор ушёл за её последнюю запись.
+    Порядок в обоих случаях один - (-pub_date, -id) из
+    RecipeCursorPagination, ?ordering= на ленту не влияет."""
+    user = request.user
+    by_follow = queryset.filter(author__following__user=user)
+    if len(get_subscriptions(request)) < FEED_FANOUT_THRESHOLD:
+        return by_follow
+    timeline = get_feed_timeline(user)
+    entries = timeline['entries']
+    if not timeline['complete']:
+        cursor = paginator.decode_cursor(request)
+        position = cursor and not cursor.reverse and cursor.position
+        if position:
+            position = parse_datetime(position)
+            remaining = sum(1 for pub_date, _ in entries
+                            if pub_date < position)
+            if remaining <= paginator.get_page_size(request):
+                return by_follow
+    return queryset.filter(pk__in=[pk for _, pk in entries])
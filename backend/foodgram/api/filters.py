@@ -1,6 +1,24 @@
+from django.db.models import Exists, OuterRef
 from django_filters.rest_framework import FilterSet, filters
+from rest_framework.filters import BaseFilterBackend
 
-from recipes.models import Ingredient, Recipe, Tag
+from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
+
+from .search import SEARCH_RESULTS_LIMIT, search_recipes
+
+TAGS_MODE_ANY = 'any'
+TAGS_MODE_ALL = 'all'
+TAGS_MODE_CHOICES = (
+    (TAGS_MODE_ANY, 'Любой из тэгов'),
+    (TAGS_MODE_ALL, 'Все тэги'),
+)
+ORDERING_POPULAR = 'popular'
+ORDERING_CHOICES = (
+    (ORDERING_POPULAR, 'Сначала популярные'),
+)
+RECIPE_ORDERINGS = {
+    ORDERING_POPULAR: ('-favorites_count', '-pub_date', '-id'),
+}
 
 
 class IngredientFilter(FilterSet):
@@ -13,27 +31,75 @@ class IngredientFilter(FilterSet):
 
 
 class TagFilter(FilterSet):
-    """Фильтр для Тэгов"""
+    """Фильтр для Тэгов.
+
+    Все условия строятся на EXISTS-подзапросах, поэтому рецепты не
+    размножаются join-ами и DISTINCT не нужен. tags_mode=all оставляет
+    рецепты со всеми переданными тэгами, по умолчанию - с любым из них.
+    ordering=popular сортирует по сохранённому счётчику избранного."""
     tags = filters.ModelMultipleChoiceFilter(
         field_name='tags__slug', to_field_name='slug',
-        queryset=Tag.objects.all())
+        queryset=Tag.objects.all(), method='filter_tags')
+    tags_mode = filters.ChoiceFilter(
+        choices=TAGS_MODE_CHOICES, method='filter_tags_mode')
     is_favorited = filters.BooleanFilter(
         method='favorite')
     is_in_shopping_cart = filters.BooleanFilter(
         method='shopping_cart')
+    ordering = filters.ChoiceFilter(
+        choices=ORDERING_CHOICES, method='filter_ordering')
 
     class Meta:
         model = Recipe
         fields = ('tags', 'author',)
 
+    def filter_tags(self, queryset, name, value):
+        if not value:
+            return queryset
+        recipe_tags = Recipe.tags.through.objects.filter(
+            recipe=OuterRef('pk'))
+        if self.form.cleaned_data.get('tags_mode') == TAGS_MODE_ALL:
+            for tag in value:
+                queryset = queryset.filter(
+                    Exists(recipe_tags.filter(tag=tag)))
+            return queryset
+        return queryset.filter(Exists(recipe_tags.filter(tag__in=value)))
+
+    def filter_tags_mode(self, queryset, name, value):
+        return queryset
+
+    def filter_ordering(self, queryset, name, value):
+        return queryset.order_by(*RECIPE_ORDERINGS[value])
+
     def favorite(self, queryset, name, value):
         user = self.request.user
         if value:
-            return queryset.filter(favorite__user=user)
+            if not user.is_authenticated:
+                return queryset.none()
+            return queryset.filter(Exists(Favorite.objects.filter(
+                user=user, recipe=OuterRef('pk'))))
         return queryset
 
     def shopping_cart(self, queryset, name, value):
         user = self.request.user
         if value:
-            return queryset.filter(recipe_in_cart__user=user)
+            if not user.is_authenticated:
+                return queryset.none()
+            return queryset.filter(Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk'))))
         return queryset
+
+
+class RecipeSearchFilter(BaseFilterBackend):
+    """Полнотекстовый поиск по ?search= в названии, ингредиентах и
+    описании рецепта с сортировкой по релевантности. Отдаёт не больше
+    results_limit самых релевантных рецептов. Работает только для
+    списка: на PostgreSQL результат - срез, который нельзя фильтровать."""
+    search_param = 'search'
+    results_limit = SEARCH_RESULTS_LIMIT
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query or getattr(view, 'action', None) != 'list':
+            return queryset
+        return search_recipes(queryset, query, self.results_limit)
@@ -0,0 +1,89 @@
+import base64
+import os
+from io import BytesIO
+from tempfile import SpooledTemporaryFile
+
+from django.core.files.base import ContentFile, File
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+MAX_IMAGE_SIZE = 10 * 1024 * 1024
+SPOOL_MAX_SIZE = 1024 * 1024
+DECODE_CHUNK_SIZE = 64 * 1024
+ALLOWED_FORMATS = {'JPEG': 'jpeg', 'PNG': 'png', 'GIF': 'gif', 'WEBP': 'webp'}
+THUMBNAIL = 'thumbnail'
+DETAIL = 'detail'
+IMAGE_VARIANTS = {
+    THUMBNAIL: (480, 480),
+    DETAIL: (1280, 1280),
+}
+VARIANT_FORMAT = 'WEBP'
+VARIANT_EXTENSION = 'webp'
+VARIANT_QUALITY = 80
+
+
+class ImageDecodeError(ValueError):
+    pass
+
+
+def decode_base64_image(data, name):
+    """Декодирование Base64 по частям во временный файл.
+
+    Размер проверяется по длине строки до декодирования, тип - по
+    заголовку файла через Pillow без чтения всего изображения."""
+    encoded = data.split(';base64,', 1)[-1]
+    if len(encoded) * 3 // 4 > MAX_IMAGE_SIZE:
+        raise ImageDecodeError('Изображение слишком большое.')
+    stream = SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    step = DECODE_CHUNK_SIZE - DECODE_CHUNK_SIZE % 4
+    try:
+        for start in range(0, len(encoded), step):
+            stream.write(base64.b64decode(encoded[start:start + step]))
+        stream.seek(0)
+        with Image.open(stream) as image:
+            extension = ALLOWED_FORMATS.get(image.format)
+    except (ValueError, OSError):
+        stream.close()
+        raise ImageDecodeError('Некорректное изображение.')
+    if extension is None:
+        stream.close()
+        raise ImageDecodeError('Неподдерживаемый формат изображения.')
+    stream.seek(0)
+    return File(stream, name=f'{name}.{extension}')
+
+
+def variant_name(name, variant):
+    root, _ = os.path.splitext(name)
+    return f'{root}.{variant}.{VARIANT_EXTENSION}'
+
+
+def variant_url(image, variant):
+    """URL уменьшенной копии, если она уже готова, иначе оригинала.
+    Готовность берётся из поля image_variants записи, которое заполняет
+    задача make_image_variants, поэтому хранилище не опрашивается."""
+    ready = getattr(image.instance, 'image_variants', None) == image.name
+    if variant is not None and ready:
+        return image.storage.url(variant_name(image.name, variant))
+    return image.url
+
+
+def make_variants(name, storage=default_storage):
+    """Создание недостающих уменьшенных WebP-копий изображения"""
+    missing = {
+        variant: size for variant, size in IMAGE_VARIANTS.items()
+        if not storage.exists(variant_name(name, variant))
+    }
+    if not missing:
+        return
+    with storage.open(name) as source, Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'A' in image.getbands()
+                                  else 'RGB')
+        for variant, size in missing.items():
+            target = variant_name(name, variant)
+            copy = image.copy()
+            copy.thumbnail(size)
+            buffer = BytesIO()
+            copy.save(buffer, VARIANT_FORMAT, quality=VARIANT_QUALITY)
+            storage.save(target, ContentFile(buffer.getvalue()))
@@ -0,0 +1,63 @@
+from bisect import bisect_left
+from threading import Lock
+
+from recipes.models import Ingredient
+
+from .cache import get_reference_version
+
+
+class IngredientIndex:
+    """Индекс названий ингредиентов в памяти процесса.
+
+    Названия хранятся отсортированными в casefold, поиск по началу строки
+    идёт бисекцией, затем добавляются совпадения по подстроке. Индекс
+    перестраивается, когда меняется версия справочника Ingredient."""
+
+    def __init__(self):
+        self.lock = Lock()
+        self.version = None
+        self.index = ([], [])
+
+    def build(self, version=None):
+        rows = sorted(
+            (
+                (name.casefold(), {
+                    'id': pk,
+                    'name': name,
+                    'measurement_unit': measurement_unit,
+                })
+                for pk, name, measurement_unit in
+                Ingredient.objects.values_list(
+                    'id', 'name', 'measurement_unit').iterator()
+            ),
+            key=lambda row: (row[0], row[1]['id']),
+        )
+        self.index = (
+            [key for key, _ in rows], [row for _, row in rows])
+        self.version = version
+
+    def refresh(self):
+        version, _ = get_reference_version(Ingredient)
+        if version != self.version:
+            with self.lock:
+                if version != self.version:
+                    self.build(version)
+
+    def search(self, query):
+        """Ингредиенты, чьё название начинается с query, затем те,
+        где query встречается внутри названия."""
+        self.refresh()
+        keys, rows = self.index
+        query = query.casefold()
+        start = end = bisect_left(keys, query)
+        while end < len(keys) and keys[end].startswith(query):
+            end += 1
+        result = rows[start:end]
+        result.extend(
+            row for index, (key, row) in enumerate(zip(keys, rows))
+            if query in key and not start <= index < end
+        )
+        return result
+
+
+ingredient_index = IngredientIndex()
@@ -0,0 +1,119 @@
+import json
+from datetime import datetime
+from statistics import mean
+from time import perf_counter
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, Tag
+from users.models import User
+
+DEFAULT_ITERATIONS = 20
+PERCENTILES = (50, 90, 99)
+
+
+def percentile(values, rank):
+    values = sorted(values)
+    index = max(0, min(len(values) - 1,
+                       round(rank / 100 * len(values)) - 1))
+    return values[index]
+
+
+class Command(BaseCommand):
+    help = ('Замер горячих эндпоинтов API: перцентили задержки и число '
+            'SQL-запросов, с сохранением отчёта в JSON')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iterations', type=int, default=DEFAULT_ITERATIONS)
+        parser.add_argument(
+            '--output', default='benchmark.json',
+            help='Файл для JSON-отчёта')
+        parser.add_argument(
+            '--label', default='',
+            help='Метка запуска, например хеш коммита')
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кеш перед каждым запросом')
+
+    def endpoints(self):
+        tags = '&'.join(
+            f'tags={slug}' for slug in
+            Tag.objects.values_list('slug', flat=True)[:2])
+        ingredient = Ingredient.objects.values_list(
+            'name', flat=True).first() or 'а'
+        return {
+            'recipes': '/api/recipes/',
+            'recipes_tags': f'/api/recipes/?{tags}',
+            'recipes_favorited': '/api/recipes/?is_favorited=1',
+            'recipes_in_cart': '/api/recipes/?is_in_shopping_cart=1',
+            'recipes_cursor': '/api/recipes/?pagination=cursor',
+            'subscriptions': '/api/users/subscriptions/?recipes_limit=3',
+            'ingredients': f'/api/ingredients/?name={ingredient[:2]}',
+            'download_shopping_cart':
+                '/api/recipes/download_shopping_cart/',
+            'download_shopping_cart_txt':
+                '/api/recipes/download_shopping_cart/?format=txt',
+        }
+
+    def handle(self, *args, **options):
+        user = (
+            User.objects
+            .annotate(follows=Count('follower', distinct=True),
+                      cart=Count('customer', distinct=True))
+            .order_by('-follows', '-cart')
+            .first()
+        )
+        if user is None:
+            raise CommandError(
+                'Нет пользователей, сначала выполните generate_data.')
+        client = APIClient()
+        client.force_authenticate(user)
+        results = {}
+        for name, url in self.endpoints().items():
+            results[name] = self.measure(
+                client, url, options['iterations'], options['cold'])
+            self.stdout.write(
+                f'{name}: p50 {results[name]["p50_ms"]:.1f} мс, '
+                f'p99 {results[name]["p99_ms"]:.1f} мс, '
+                f'запросов {results[name]["queries"]}')
+        report = {
+            'label': options['label'],
+            'created': datetime.now().isoformat(),
+            'user': user.username,
+            'iterations': options['iterations'],
+            'cold': options['cold'],
+            'results': results,
+        }
+        with open(options['output'], 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        self.stdout.write(self.style.SUCCESS(
+            f'Отчёт сохранён в {options["output"]}'))
+
+    def measure(self, client, url, iterations, cold):
+        timings = []
+        queries = []
+        for _ in range(iterations):
+            if cold:
+                cache.clear()
+            with CaptureQueriesContext(connection) as context:
+                start = perf_counter()
+                response = client.get(url)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                timings.append((perf_counter() - start) * 1000)
+            queries.append(len(context.captured_queries))
+        result = {
+            'url': url,
+            'status': response.status_code,
+            'mean_ms': mean(timings),
+            'queries': max(queries),
+        }
+        for rank in PERCENTILES:
+            result[f'p{rank}_ms'] = percentile(timings, rank)
+        return result
@@ -0,0 +1,44 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+
+from api.ingredient_index import ingredient_index
+from recipes.models import Ingredient
+
+DEFAULT_QUERIES = ('а', 'мо', 'мол', 'сыр', 'кар', 'пер', 'со', 'ябл')
+DEFAULT_REPEAT = 20
+
+
+class Command(BaseCommand):
+    help = 'Сравнение поиска ингредиентов через ORM и индекс в памяти'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--queries', nargs='+', default=DEFAULT_QUERIES,
+            help='Строки поиска')
+        parser.add_argument(
+            '--repeat', type=int, default=DEFAULT_REPEAT,
+            help='Количество повторов для каждой строки')
+
+    def measure(self, search, queries, repeat):
+        start = perf_counter()
+        for _ in range(repeat):
+            for query in queries:
+                search(query)
+        return (perf_counter() - start) / (repeat * len(queries)) * 1000
+
+    def handle(self, *args, **options):
+        queries = options['queries']
+        repeat = options['repeat']
+        start = perf_counter()
+        ingredient_index.refresh()
+        self.stdout.write(
+            f'Построение индекса: {(perf_counter() - start) * 1000:.1f} мс')
+        orm = self.measure(
+            lambda query: list(Ingredient.objects.filter(
+                name__istartswith=query).values(
+                    'id', 'name', 'measurement_unit')),
+            queries, repeat)
+        index = self.measure(ingredient_index.search, queries, repeat)
+        self.stdout.write(f'ORM (istartswith): {orm:.3f} мс на запрос')
+        self.stdout.write(f'Индекс в памяти: {index:.3f} мс на запрос')
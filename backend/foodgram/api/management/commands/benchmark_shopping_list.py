@@ -0,0 +1,37 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+
+from api.shopping_list import ShoppingListPDF
+
+DEFAULT_SIZES = (10, 100, 1000)
+DEFAULT_REPEAT = 5
+
+
+class Command(BaseCommand):
+    help = 'Замер времени построения PDF со списком покупок'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+            help='Количество ингредиентов в корзине')
+        parser.add_argument(
+            '--repeat', type=int, default=DEFAULT_REPEAT,
+            help='Количество повторов для каждого размера')
+
+    def handle(self, *args, **options):
+        for size in options['sizes']:
+            ingredients = [
+                (f'Ингредиент {number}', number, 'г')
+                for number in range(size)
+            ]
+            timings = []
+            for _ in range(options['repeat']):
+                start = perf_counter()
+                document = ShoppingListPDF('benchmark', ingredients).render()
+                timings.append(perf_counter() - start)
+            self.stdout.write(
+                f'{size} ингредиентов: '
+                f'min {min(timings) * 1000:.1f} мс, '
+                f'max {max(timings) * 1000:.1f} мс, '
+                f'{len(document.getvalue()) // 1024} КБ')
@@ -0,0 +1,157 @@
+import random
+from io import BytesIO
+from uuid import uuid4
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from PIL import Image
+
+from recipes.models import (AmountIngredient, Favorite, Ingredient, Recipe,
+                            ShoppingCart, Tag)
+from users.models import Follow, User
+
+BATCH_SIZE = 1000
+PASSWORD = 'benchmark123'
+DEFAULT_TAGS = (
+    ('Завтрак', '#E26C2D', 'breakfast'),
+    ('Обед', '#49B64E', 'lunch'),
+    ('Ужин', '#8775D2', 'dinner'),
+)
+SYNTHETIC_INGREDIENTS = 1000
+MEASUREMENT_UNITS = ('г', 'кг', 'мл', 'л', 'шт', 'ст. л.', 'ч. л.')
+PLACEHOLDER_IMAGE = 'api/images/recipes/benchmark.png'
+PLACEHOLDER_SIZE = (640, 480)
+PLACEHOLDER_COLOR = '#D1E6FA'
+
+
+class Command(BaseCommand):
+    help = ('Генерация синтетических данных: пользователи, подписки, '
+            'рецепты с ингредиентами и тэгами, избранное и корзины')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--recipes', type=int, default=1000)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8)
+        parser.add_argument('--tags-per-recipe', type=int, default=2)
+        parser.add_argument('--follows-per-user', type=int, default=10)
+        parser.add_argument('--favorites-per-user', type=int, default=20)
+        parser.add_argument('--cart-per-user', type=int, default=5)
+        parser.add_argument(
+            '--seed', type=int, default=None,
+            help='Зерно генератора случайных чисел')
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        token = uuid4().hex[:8]
+        users = self.create_users(token, options['users'])
+        tags = self.ensure_tags()
+        ingredients = self.ensure_ingredients()
+        recipes = self.create_recipes(token, users, options['recipes'])
+        self.bulk_create(Recipe.tags.through, (
+            Recipe.tags.through(recipe_id=recipe, tag_id=tag)
+            for recipe in recipes
+            for tag in self.sample(tags, options['tags_per_recipe'])
+        ))
+        self.bulk_create(AmountIngredient, (
+            AmountIngredient(
+                recipe_id=recipe, ingredient_id=ingredient,
+                amount=self.random.randint(1, 500))
+            for recipe in recipes
+            for ingredient in self.sample(
+                ingredients, options['ingredients_per_recipe'])
+        ))
+        self.bulk_create(Follow, (
+            Follow(user_id=user, author_id=author)
+            for user in users
+            for author in self.sample(users, options['follows_per_user'])
+            if author != user
+        ))
+        self.bulk_create(Favorite, (
+            Favorite(user_id=user, recipe_id=recipe)
+            for user in users
+            for recipe in self.sample(recipes, options['favorites_per_user'])
+        ))
+        self.bulk_create(ShoppingCart, (
+            ShoppingCart(user_id=user, recipe_id=recipe)
+            for user in users
+            for recipe in self.sample(recipes, options['cart_per_user'])
+        ))
+        Recipe.objects.filter(pk__in=recipes).recalculate_counters()
+        User.objects.filter(pk__in=users).recalculate_counters()
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано пользователей: {len(users)}, рецептов: {len(recipes)} '
+            f'(метка {token}, пароль {PASSWORD})'))
+
+    def sample(self, population, count):
+        return self.random.sample(population, min(count, len(population)))
+
+    def bulk_create(self, model, objects):
+        batch = []
+        for obj in objects:
+            batch.append(obj)
+            if len(batch) == BATCH_SIZE:
+                model.objects.bulk_create(batch, ignore_conflicts=True)
+                batch = []
+        model.objects.bulk_create(batch, ignore_conflicts=True)
+
+    def create_users(self, token, count):
+        password = make_password(PASSWORD)
+        self.bulk_create(User, (
+            User(
+                username=f'user_{token}_{number}',
+                email=f'user_{token}_{number}@example.com',
+                first_name='Имя',
+                last_name='Фамилия',
+                password=password,
+            )
+            for number in range(count)
+        ))
+        return list(User.objects.filter(
+            username__startswith=f'user_{token}_').values_list(
+                'id', flat=True))
+
+    def ensure_tags(self):
+        for name, color, slug in DEFAULT_TAGS:
+            Tag.objects.get_or_create(
+                slug=slug, defaults={'name': name, 'color': color})
+        return list(Tag.objects.values_list('id', flat=True))
+
+    def ensure_ingredients(self):
+        if not Ingredient.objects.exists():
+            self.bulk_create(Ingredient, (
+                Ingredient(
+                    name=f'ингредиент {number}',
+                    measurement_unit=self.random.choice(MEASUREMENT_UNITS))
+                for number in range(SYNTHETIC_INGREDIENTS)
+            ))
+        return list(Ingredient.objects.values_list('id', flat=True))
+
+    def ensure_image(self):
+        """Одно изображение-заглушка на все сгенерированные рецепты"""
+        if not default_storage.exists(PLACEHOLDER_IMAGE):
+            buffer = BytesIO()
+            Image.new('RGB', PLACEHOLDER_SIZE, PLACEHOLDER_COLOR).save(
+                buffer, 'PNG')
+            default_storage.save(
+                PLACEHOLDER_IMAGE, ContentFile(buffer.getvalue()))
+        return PLACEHOLDER_IMAGE
+
+    def create_recipes(self, token, users, count):
+        image = self.ensure_image()
+        self.bulk_create(Recipe, (
+            Recipe(
+                author_id=self.random.choice(users),
+                image=image,
+                name=f'Рецепт {token} {number}',
+                text='Описание рецепта ' * self.random.randint(5, 50),
+                cooking_time=self.random.randint(1, 180),
+            )
+            for number in range(count)
+        ))
+        return list(Recipe.objects.filter(
+            name__startswith=f'Рецепт {token} ').values_list(
+                'id', flat=True))
@@ -0,0 +1,201 @@
+import csv
+import json
+import os
+from io import StringIO
+from itertools import chain, islice
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from api.cache import invalidate_reference
+from recipes.models import Ingredient
+
+DEFAULT_BATCH_SIZE = 5000
+READ_CHUNK_SIZE = 64 * 1024
+CSV_HEADER = ('name', 'measurement_unit')
+IMPORT_TABLE = 'ingredient_import'
+# Что ожидается следующим в JSON-массиве: первый объект или «]»,
+# объект после запятой, запятая или «]» после объекта.
+JSON_FIRST = 'first'
+JSON_VALUE = 'value'
+JSON_SEPARATOR = 'separator'
+
+
+def read_csv(file):
+    """Строки «название,единица измерения», заголовок допускается только
+    первой строкой, пустые строки пропускаются"""
+    reader = csv.reader(file)
+    for row in reader:
+        row = [cell.strip() for cell in row]
+        if not any(row):
+            continue
+        if reader.line_num == 1 and tuple(row) == CSV_HEADER:
+            continue
+        if len(row) != len(CSV_HEADER) or not all(row):
+            raise CommandError(
+                f'Строка {reader.line_num}: ожидается '
+                f'«название,единица измерения», получено {row!r}.')
+        yield tuple(row)
+
+
+def json_row(item):
+    """(name, measurement_unit) из объекта JSON-массива"""
+    if not isinstance(item, dict):
+        raise CommandError(f'Ожидается объект ингредиента, получено: {item!r}')
+    try:
+        row = tuple(item[key].strip() for key in CSV_HEADER)
+    except KeyError as error:
+        raise CommandError(f'В объекте {item!r} нет ключа {error}.')
+    except AttributeError:
+        raise CommandError(f'Поля {CSV_HEADER} должны быть строками: {item!r}')
+    if not all(row):
+        raise CommandError(f'Пустое название или единица измерения: {item!r}')
+    return row
+
+
+def ensure_end(file, rest):
+    """После закрывающей «]» допускаются только пробельные символы"""
+    for chunk in chain((rest,), iter(lambda: file.read(READ_CHUNK_SIZE), '')):
+        if chunk.strip():
+            raise CommandError(
+                f'Лишние данные после JSON-массива: «{chunk.strip()[:50]}».')
+
+
+def read_json(file):
+    """Потоковое чтение JSON-массива объектов без загрузки файла целиком.
+    Между объектами ожидается ровно одна запятая, после массива -
+    только пробельные символы."""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    started = False
+    expected = JSON_FIRST
+    for chunk in iter(lambda: file.read(READ_CHUNK_SIZE), ''):
+        buffer += chunk
+        while True:
+            buffer = buffer.lstrip()
+            if not buffer:
+                break
+            if not started:
+                if not buffer.startswith('['):
+                    raise CommandError('Ожидается JSON-массив.')
+                buffer = buffer[1:]
+                started = True
+                continue
+            if buffer.startswith(']') and expected != JSON_VALUE:
+                ensure_end(file, buffer[1:])
+                return
+            if expected == JSON_SEPARATOR:
+                if not buffer.startswith(','):
+                    raise CommandError(
+                        f'Ожидается «,» или «]», получено «{buffer[:50]}».')
+                buffer = buffer[1:]
+                expected = JSON_VALUE
+                continue
+            if buffer.startswith((',', ']')):
+                raise CommandError(
+                    f'Ожидается объект ингредиента, получено «{buffer[:50]}».')
+            try:
+                item, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                break
+            buffer = buffer[end:]
+            expected = JSON_SEPARATOR
+            yield json_row(item)
+    if not started:
+        raise CommandError('Ожидается JSON-массив.')
+    if buffer:
+        try:
+            decoder.raw_decode(buffer)
+        except json.JSONDecodeError as error:
+            raise CommandError(
+                f'Некорректный JSON: {error.msg} в «{buffer[:50]}».')
+    raise CommandError('JSON-массив не закрыт: нет завершающей «]».')
+
+
+def unique_rows(rows):
+    """Отсеивает повторы (name, measurement_unit) внутри файла"""
+    seen = set()
+    for row in rows:
+        if row[0] and row not in seen:
+            seen.add(row)
+            yield row
+
+
+def batches(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+class Command(BaseCommand):
+    help = 'Загрузка справочника ингредиентов из CSV или JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к ingredients.csv/.json')
+        parser.add_argument(
+            '--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+            help='Размер пачки для вставки')
+        parser.add_argument(
+            '--no-copy', action='store_true',
+            help='Не использовать COPY даже на PostgreSQL')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        extension = os.path.splitext(path)[1].lower()
+        readers = {'.csv': read_csv, '.json': read_json}
+        if extension not in readers:
+            raise CommandError('Поддерживаются только .csv и .json файлы.')
+        use_copy = (connection.vendor == 'postgresql'
+                    and not options['no_copy'])
+        load = self.copy_rows if use_copy else self.bulk_create_rows
+        before = Ingredient.objects.count()
+        start = perf_counter()
+        with open(path, encoding='utf-8') as file:
+            read = load(
+                unique_rows(readers[extension](file)), options['batch_size'])
+        elapsed = perf_counter() - start
+        created = Ingredient.objects.count() - before
+        invalidate_reference(Ingredient)
+        self.stdout.write(self.style.SUCCESS(
+            f'Прочитано {read}, добавлено {created} ингредиентов '
+            f'за {elapsed:.2f} с ({read / max(elapsed, 1e-9):.0f} строк/с, '
+            f'{"COPY" if use_copy else "bulk_create"})'))
+
+    @transaction.atomic
+    def bulk_create_rows(self, rows, batch_size):
+        read = 0
+        for batch in batches(rows, batch_size):
+            Ingredient.objects.bulk_create(
+                [Ingredient(name=name, measurement_unit=measurement_unit)
+                 for name, measurement_unit in batch],
+                ignore_conflicts=True)
+            read += len(batch)
+        return read
+
+    @transaction.atomic
+    def copy_rows(self, rows, batch_size):
+        """COPY во временную таблицу и одна вставка с ON CONFLICT"""
+        table = Ingredient._meta.db_table
+        read = 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE TEMP TABLE {IMPORT_TABLE} '
+                '(name varchar(200), measurement_unit varchar(200)) '
+                'ON COMMIT DROP')
+            for batch in batches(rows, batch_size):
+                buffer = StringIO()
+                csv.writer(buffer).writerows(batch)
+                buffer.seek(0)
+                cursor.copy_expert(
+                    f'COPY {IMPORT_TABLE} FROM STDIN WITH (FORMAT csv)',
+                    buffer)
+                read += len(batch)
+            cursor.execute(
+                f'INSERT INTO {table} (name, measurement_unit) '
+                f'SELECT name, measurement_unit FROM {IMPORT_TABLE} '
+                'ON CONFLICT (name, measurement_unit) DO NOTHING')
+        return read
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.search import is_postgresql, update_search_vectors
+from recipes.models import Recipe
+
+DEFAULT_BATCH_SIZE = 10000
+
+
+class Command(BaseCommand):
+    help = ('Пересчёт поисковых векторов всех рецептов, например после '
+            'миграции или массовой загрузки данных')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+            help='Сколько рецептов обновлять в одной транзакции')
+
+    def handle(self, *args, **options):
+        ids = Recipe.objects.order_by('pk').values_list('pk', flat=True)
+        if not is_postgresql():
+            update_search_vectors([])
+            self.stdout.write(self.style.SUCCESS(
+                'Индекс в памяти будет перестроен при следующем поиске.'))
+            return
+        updated = 0
+        last = 0
+        while True:
+            batch = list(ids.filter(pk__gt=last)[:options['batch_size']])
+            if not batch:
+                break
+            with transaction.atomic():
+                update_search_vectors(batch)
+            updated += len(batch)
+            last = batch[-1]
+        self.stdout.write(self.style.SUCCESS(
+            f'Обновлено рецептов: {updated}'))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from users.models import User
+
+DEFAULT_BATCH_SIZE = 10000
+
+
+class Command(BaseCommand):
+    help = ('Пересчёт счётчиков рецептов и подписчиков у пользователей '
+            'по таблицам Recipe и Follow')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+            help='Сколько пользователей пересчитывать одним UPDATE')
+
+    def handle(self, *args, **options):
+        ids = User.objects.order_by('pk').values_list('pk', flat=True)
+        updated = 0
+        last = 0
+        while True:
+            batch = list(ids.filter(pk__gt=last)[:options['batch_size']])
+            if not batch:
+                break
+            updated += User.objects.filter(
+                pk__in=batch).recalculate_counters()
+            last = batch[-1]
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано пользователей: {updated}'))
@@ -0,0 +1,144 @@
+import os
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+from threading import Lock
+from time import perf_counter
+
+PREFIX = 'foodgram'
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+COUNTER = 'counter'
+HISTOGRAM = 'histogram'
+GAUGE = 'gauge'
+METRICS = {
+    'http_requests_total': (
+        COUNTER, 'Запросы по view, action, методу и статусу'),
+    'http_request_duration_seconds': (
+        HISTOGRAM, 'Время обработки запроса', LATENCY_BUCKETS),
+    'db_queries': (
+        HISTOGRAM, 'SQL-запросов на один HTTP-запрос', QUERY_BUCKETS),
+    'db_query_duration_seconds': (
+        HISTOGRAM, 'Суммарное время SQL на один HTTP-запрос',
+        LATENCY_BUCKETS),
+    'cache_requests_total': (
+        COUNTER, 'Обращения к кешу по результату (hit/miss)'),
+    'cache_hit_ratio': (GAUGE, 'Доля попаданий в кеш'),
+    'pdf_render_duration_seconds': (
+        HISTOGRAM, 'Время рендеринга PDF со списком покупок',
+        LATENCY_BUCKETS),
+}
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(
+            name, str(value).replace('\\', r'\\').replace('"', r'\"'))
+        for name, value in labels)
+    return '{' + pairs + '}'
+
+
+def format_value(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class MetricsRegistry:
+    """Метрики процесса в памяти, выгружаются в текстовом формате
+    Prometheus. У каждого воркера gunicorn свой реестр, поэтому в выгрузку
+    добавляется метка pid."""
+
+    def __init__(self):
+        self.lock = Lock()
+        self.counters = defaultdict(float)
+        self.histograms = {}
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] += value
+
+    def observe(self, name, value, **labels):
+        buckets = METRICS[name][2]
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [
+                    [0] * (len(buckets) + 1), 0.0, 0]
+            histogram[0][bisect_left(buckets, value)] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    @contextmanager
+    def timer(self, name, **labels):
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, perf_counter() - start, **labels)
+
+    def cache_lookup(self, cache_name, hit):
+        self.inc('cache_requests_total', cache=cache_name,
+                 result='hit' if hit else 'miss')
+
+    def cache_ratios(self):
+        totals = defaultdict(lambda: [0, 0])
+        for (name, labels), value in self.counters.items():
+            if name == 'cache_requests_total':
+                labels = dict(labels)
+                totals[labels['cache']][labels['result'] == 'hit'] += value
+        return {
+            (('cache', cache_name),): hits / (hits + misses)
+            for cache_name, (misses, hits) in totals.items()
+        }
+
+    def export(self):
+        pid = (('pid', os.getpid()),)
+        with self.lock:
+            counters = dict(self.counters)
+            histograms = {
+                key: (list(buckets), total, count)
+                for key, (buckets, total, count) in self.histograms.items()
+            }
+            gauges = {'cache_hit_ratio': self.cache_ratios()}
+        lines = []
+        for name, (kind, description, *buckets) in METRICS.items():
+            full_name = f'{PREFIX}_{name}'
+            lines.append(f'# HELP {full_name} {description}')
+            lines.append(f'# TYPE {full_name} {kind}')
+            if kind == COUNTER:
+                values = (
+                    (labels, value)
+                    for (metric, labels), value in sorted(counters.items())
+                    if metric == name
+                )
+            elif kind == GAUGE:
+                values = sorted(gauges[name].items())
+            else:
+                for (metric, labels), histogram in sorted(
+                        histograms.items()):
+                    if metric == name:
+                        lines.extend(self.export_histogram(
+                            full_name, buckets[0], labels + pid, *histogram))
+                continue
+            lines.extend(
+                f'{full_name}{format_labels(labels + pid)} '
+                f'{format_value(value)}'
+                for labels, value in values)
+        return '\n'.join(lines) + '\n'
+
+    def export_histogram(self, name, buckets, labels, counts, total, count):
+        cumulative = 0
+        for bound, bucket_count in zip(buckets + ('+Inf',), counts):
+            cumulative += bucket_count
+            bucket_labels = labels + (('le', bound),)
+            yield f'{name}_bucket{format_labels(bucket_labels)} {cumulative}'
+        yield f'{name}_sum{format_labels(labels)} {format_value(total)}'
+        yield f'{name}_count{format_labels(labels)} {count}'
+
+
+registry = MetricsRegistry()
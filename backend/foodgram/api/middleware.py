@@ -0,0 +1,144 @@
+import logging
+import random
+from collections import Counter
+from contextlib import ExitStack
+from time import perf_counter
+
+from django.conf import settings
+from django.db import connections
+
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+MS = 1000
+TOP_REPEATED_QUERIES = 3
+SQL_PREVIEW_LENGTH = 200
+UNKNOWN_VIEW = 'unresolved'
+
+
+class QueryCounter:
+    """Число и суммарное время SQL-запросов для connection.execute_wrapper"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += perf_counter() - start
+            self.count += 1
+
+
+class QueryStats(QueryCounter):
+    """Счётчик с группировкой запросов по шаблону SQL без параметров,
+    поэтому повторы одного запроса с разными id (N+1) попадают в одну
+    группу."""
+
+    def __init__(self):
+        super().__init__()
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        self.statements[sql] += 1
+        return super().__call__(execute, sql, params, many, context)
+
+    def repeated(self, limit=TOP_REPEATED_QUERIES):
+        return [(sql, count)
+                for sql, count in self.statements.most_common(limit)
+                if count > 1]
+
+
+class RequestTimingMiddleware:
+    """Время ответа, SQL-запросы и время рендеринга по каждому запросу.
+
+    Время и число запросов к базе пишутся в метрики для всех запросов.
+    Детальная статистика собирается только для доли запросов
+    REQUEST_TIMING_SAMPLE_RATE и отдаётся в заголовке Server-Timing:
+    view включает serializer.data, render - только рендеринг ответа DRF
+    в JSON/PDF после view.
+    Запросы дольше SLOW_REQUEST_MS попадают в лог, для выборочных - с
+    самыми частыми повторяющимися SQL."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = settings.REQUEST_TIMING_SAMPLE_RATE
+        self.slow_request = settings.SLOW_REQUEST_MS / MS
+
+    def __call__(self, request):
+        start = perf_counter()
+        sampled = random.random() < self.sample_rate
+        if sampled:
+            request._view_started = request._view_finished = None
+            stats = QueryStats()
+        else:
+            stats = QueryCounter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(stats))
+            response = self.get_response(request)
+        total = perf_counter() - start
+        self.record(request, response, total, stats)
+        if sampled:
+            response['Server-Timing'] = self.server_timing(
+                request, stats, start, total)
+        if total >= self.slow_request:
+            self.log_slow(
+                request, response, total, stats if sampled else None)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view = getattr(view_func, 'cls', view_func)
+        actions = getattr(view_func, 'actions', None) or {}
+        request._metrics_labels = {
+            'view': getattr(view, '__name__', UNKNOWN_VIEW),
+            'action': actions.get(request.method.lower(), ''),
+        }
+        if hasattr(request, '_view_started'):
+            request._view_started = perf_counter()
+
+    def process_template_response(self, request, response):
+        """Вызывается после view и до рендеринга ответа DRF"""
+        if hasattr(request, '_view_finished'):
+            request._view_finished = perf_counter()
+        return response
+
+    def record(self, request, response, total, stats):
+        labels = getattr(request, '_metrics_labels', None) or {
+            'view': UNKNOWN_VIEW, 'action': ''}
+        registry.inc(
+            'http_requests_total', method=request.method,
+            status=str(response.status_code), **labels)
+        registry.observe('http_request_duration_seconds', total, **labels)
+        registry.observe('db_queries', stats.count, **labels)
+        registry.observe('db_query_duration_seconds', stats.duration,
+                         **labels)
+
+    def server_timing(self, request, stats, start, total):
+        metrics = [
+            f'db;dur={stats.duration * MS:.1f};desc="{stats.count} queries"',
+        ]
+        view_started = request._view_started
+        view_finished = request._view_finished
+        if view_started is not None and view_finished is not None:
+            metrics.append(
+                f'view;dur={(view_finished - view_started) * MS:.1f}')
+            render = start + total - view_finished
+            metrics.append(f'render;dur={render * MS:.1f}')
+        metrics.append(f'total;dur={total * MS:.1f}')
+        return ', '.join(metrics)
+
+    def log_slow(self, request, response, total, stats=None):
+        message = '%s %s -> %s за %.0f мс'
+        args = [request.method, request.get_full_path(),
+                response.status_code, total * MS]
+        if stats is not None:
+            message += ', SQL: %s запросов за %.0f мс'
+            args += [stats.count, stats.duration * MS]
+            for sql, count in stats.repeated():
+                message += '\n  %s раз: %s'
+                args += [count, sql[:SQL_PREVIEW_LENGTH]]
+        logger.warning(message, *args)
@@ -0,0 +1,45 @@
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.response import Response
+
+from .cache import (REFERENCE_TIMEOUT, get_reference_etag,
+                    get_reference_response_key, get_reference_version)
+from .metrics import registry
+
+
+class ReferenceCacheMixin:
+    """Кеширование GET-ответов справочника с ETag и Last-Modified.
+
+    Версия справочника сбрасывается сигналами при любой записи в модель,
+    поэтому If-None-Match проверяется без обращения к базе."""
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs)
+
+    def cached_response(self, view, request, *args, **kwargs):
+        model = self.get_queryset().model
+        version, last_modified = get_reference_version(model)
+        path = request.get_full_path()
+        etag = get_reference_etag(version, path)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified)
+        if response is None:
+            key = get_reference_response_key(model, version, path)
+            data = cache.get(key)
+            registry.cache_lookup('reference', data is not None)
+            if data is None:
+                response = view(request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+                data = response.data
+                cache.set(key, data, REFERENCE_TIMEOUT)
+            response = Response(data)
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        return response
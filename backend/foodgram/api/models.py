@@ -0,0 +1,29 @@
+from django.db import models
+
+
+class ReferenceVersion(models.Model):
+    """Версия справочника для кеша ответов и индексов в памяти.
+
+    Хранится в базе, поэтому изменение из любого процесса (команды
+    manage.py, обработчик задач, shell) видят все воркеры, даже с
+    локальным кешем."""
+    label = models.CharField(
+        max_length=100,
+        primary_key=True,
+        verbose_name='Модель',
+    )
+    version = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Версия',
+    )
+    changed = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Изменён',
+    )
+
+    class Meta:
+        verbose_name = 'Версия справочника'
+        verbose_name_plural = 'Версии справочников'
+
+    def __str__(self):
+        return f'{self.label} v{self.version}'
@@ -0,0 +1,48 @@
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+
+from .filters import RECIPE_ORDERINGS, RecipeSearchFilter
+
+CURSOR_MODE = 'cursor'
+MAX_PAGE_SIZE = 100
+
+
+class RecipeCursorPagination(CursorPagination):
+    """Курсорная пагинация ленты рецептов по (pub_date, id).
+
+    Включается параметром ?pagination=cursor, дальше клиент идёт по
+    ссылкам next/previous. Не считает COUNT(*) и не использует OFFSET,
+    поэтому глубокие страницы стоят столько же, сколько первая.
+    Курсор DRF хранит позицию только по первому полю сортировки, поэтому
+    с ?ordering= из RECIPE_ORDERINGS и с ?search= (сортировка по
+    релевантности) он не включается и такие запросы идут через
+    постраничную пагинацию."""
+    ordering = ('-pub_date', '-id')
+    page_size_query_param = 'limit'
+    max_page_size = MAX_PAGE_SIZE
+    mode_query_param = 'pagination'
+    ordering_query_param = 'ordering'
+
+    @classmethod
+    def is_requested(cls, request):
+        params = request.query_params
+        return (
+            (params.get(cls.mode_query_param) == CURSOR_MODE
+             or cls.cursor_query_param in params)
+            and params.get(cls.ordering_query_param) not in RECIPE_ORDERINGS
+            and not params.get(RecipeSearchFilter.search_param, '').strip()
+        )
+
+    def decode_cursor(self, request):
+        """Позиция курсора должна быть датой публикации, иначе фильтр
+        по pub_date падает с ошибкой сервера вместо 404"""
+        cursor = super().decode_cursor(request)
+        if cursor and cursor.position is not None:
+            try:
+                position = parse_datetime(cursor.position)
+            except ValueError:
+                position = None
+            if position is None:
+                raise NotFound(self.invalid_cursor_message)
+        return cursor
@@ -0,0 +1,103 @@
+import csv
+import json
+
+from rest_framework import renderers
+
+from .metrics import registry
+from .shopping_list import ShoppingListPDF
+
+CHUNK_SIZE = 64 * 1024
+CSV_HEADER = ('Ингредиент', 'Количество', 'Единица измерения')
+TEXT_LINE = '{}. {} - {} {}\n'
+
+
+class EchoBuffer:
+    """Псевдо-файл для csv.writer: возвращает строку вместо записи"""
+
+    def write(self, value):
+        return value
+
+
+class ShoppingListRenderer(renderers.BaseRenderer):
+    """Базовый рендерер списка покупок.
+
+    Список отдаётся потоком через stream(), а render() используется DRF
+    только для служебных ответов (ошибок) и всегда отдаёт JSON."""
+    charset = 'utf-8'
+    cache_document = False
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        response = (renderer_context or {}).get('response')
+        if response is not None:
+            response['Content-Type'] = 'application/json'
+        return renderers.JSONRenderer().render(data)
+
+    @property
+    def content_type(self):
+        if self.charset:
+            return f'{self.media_type}; charset={self.charset}'
+        return self.media_type
+
+    def stream(self, user, ingredients):
+        """Итератор по частям документа. ingredients - кортежи
+        (название, количество, единица измерения)."""
+        raise NotImplementedError(
+            'ShoppingListRenderer.stream() must be implemented.')
+
+
+class PDFShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'application/pdf'
+    format = 'pdf'
+    charset = None
+    cache_document = True
+
+    def stream(self, user, ingredients):
+        with registry.timer('pdf_render_duration_seconds'):
+            document = ShoppingListPDF(user, ingredients).render()
+        return iter(lambda: document.read(CHUNK_SIZE), b'')
+
+
+class TextShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def stream(self, user, ingredients):
+        yield f'Список продуктов для {str(user)}\n\n'
+        for index, ingredient in enumerate(ingredients, 1):
+            yield TEXT_LINE.format(index, *ingredient)
+
+
+class CSVShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def stream(self, user, ingredients):
+        writer = csv.writer(EchoBuffer())
+        yield writer.writerow(CSV_HEADER)
+        for ingredient in ingredients:
+            yield writer.writerow(ingredient)
+
+
+class JSONShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'application/json'
+    format = 'json'
+
+    def stream(self, user, ingredients):
+        yield '['
+        separator = ''
+        for name, amount, measurement_unit in ingredients:
+            yield separator + json.dumps({
+                'name': name,
+                'amount': amount,
+                'measurement_unit': measurement_unit,
+            }, ensure_ascii=False)
+            separator = ','
+        yield ']'
+
+
+SHOPPING_LIST_RENDERERS = (
+    PDFShoppingListRenderer,
+    TextShoppingListRenderer,
+    CSVShoppingListRenderer,
+    JSONShoppingListRenderer,
+)
@@ -0,0 +1,151 @@
+import re
+from bisect import bisect_left
+from collections import defaultdict
+from threading import Lock
+
+from django.db import connection
+from django.db.models import BooleanField, Case, FloatField, Value, When
+from django.db.models.expressions import RawSQL
+
+from recipes.models import AmountIngredient, Recipe
+
+from .cache import get_reference_version, invalidate_reference
+
+SEARCH_CONFIG = 'russian'
+SEARCH_RESULTS_LIMIT = 200
+TOKEN_PATTERN = re.compile(r'\w+')
+# Веса как у setweight/ts_rank в PostgreSQL: A - название,
+# B - ингредиенты, C - описание.
+NAME_WEIGHT = 1.0
+INGREDIENT_WEIGHT = 0.4
+TEXT_WEIGHT = 0.2
+RECIPE_TABLE = Recipe._meta.db_table
+UPDATE_SEARCH_VECTOR = f'''
+    UPDATE {RECIPE_TABLE} AS recipe SET search_vector =
+        setweight(to_tsvector('{SEARCH_CONFIG}', recipe.name), 'A')
+        || setweight(to_tsvector('{SEARCH_CONFIG}', coalesce((
+            SELECT string_agg(ingredient.name, ' ')
+            FROM recipes_amountingredient AS amount
+            JOIN recipes_ingredient AS ingredient
+                ON ingredient.id = amount.ingredient_id
+            WHERE amount.recipe_id = recipe.id), '')), 'B')
+        || setweight(to_tsvector('{SEARCH_CONFIG}', recipe.text), 'C')
+    WHERE recipe.id = ANY(%s)
+'''
+SEARCH_QUERY = f"websearch_to_tsquery('{SEARCH_CONFIG}', %s)"
+SEARCH_ORDERING = ('-search_rank', '-pub_date', '-id')
+
+
+def is_postgresql():
+    return connection.vendor == 'postgresql'
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.casefold())
+
+
+def update_search_vectors(recipe_ids):
+    """Пересчёт сохранённого поискового вектора рецептов.
+    Без PostgreSQL сбрасывается версия индекса в памяти."""
+    if not is_postgresql():
+        invalidate_reference(Recipe)
+        return
+    recipe_ids = list(recipe_ids)
+    if recipe_ids:
+        with connection.cursor() as cursor:
+            cursor.execute(UPDATE_SEARCH_VECTOR, [recipe_ids])
+
+
+class RecipeSearchIndex:
+    """Обратный индекс рецептов в памяти процесса для баз без
+    полнотекстового поиска (SQLite).
+
+    Каждое слово названия, ингредиентов и описания указывает на рецепты
+    с суммой весов вхождений. Слова запроса ищутся по началу слова,
+    что отчасти заменяет стемминг. Индекс перестраивается целиком, когда
+    меняется версия, сброшенная update_search_vectors."""
+
+    def __init__(self):
+        self.lock = Lock()
+        self.version = None
+        self.index = ([], [])
+
+    def build(self, version=None):
+        postings = defaultdict(lambda: defaultdict(float))
+        for pk, name, text in Recipe.objects.values_list(
+                'id', 'name', 'text').iterator():
+            for token in tokenize(name):
+                postings[token][pk] += NAME_WEIGHT
+            for token in tokenize(text):
+                postings[token][pk] += TEXT_WEIGHT
+        for pk, name in AmountIngredient.objects.values_list(
+                'recipe_id', 'ingredient__name').iterator():
+            for token in tokenize(name):
+                postings[token][pk] += INGREDIENT_WEIGHT
+        keys = sorted(postings)
+        self.index = (keys, [dict(postings[key]) for key in keys])
+        self.version = version
+
+    def refresh(self):
+        version, _ = get_reference_version(Recipe)
+        if version != self.version:
+            with self.lock:
+                if version != self.version:
+                    self.build(version)
+
+    def search(self, query):
+        """Список (id, ранг) рецептов, содержащих все слова запроса,
+        от более релевантных к менее"""
+        self.refresh()
+        keys, postings = self.index
+        scores = None
+        for term in tokenize(query):
+            matched = defaultdict(float)
+            index = bisect_left(keys, term)
+            while index < len(keys) and keys[index].startswith(term):
+                for pk, score in postings[index].items():
+                    matched[pk] += score
+                index += 1
+            if scores is None:
+                scores = matched
+            else:
+                scores = {
+                    pk: score + matched[pk]
+                    for pk, score in scores.items() if pk in matched}
+            if not scores:
+                return []
+        return sorted(
+            (scores or {}).items(), key=lambda item: (-item[1], -item[0]))
+
+
+recipe_index = RecipeSearchIndex()
+
+
+def search_recipes(queryset, query, limit=SEARCH_RESULTS_LIMIT):
+    """Не больше limit самых релевантных рецептов из queryset, подходящих
+    под запрос, с аннотацией search_rank, от более релевантных к менее.
+
+    Ограничение одинаково на обеих базах и применяется после остальных
+    фильтров, поэтому count и страницы согласованы между собой. На
+    PostgreSQL возвращается срез: RawSQL ссылается на таблицу по имени,
+    и во вложенном запросе с переименованной таблицей он указывал бы на
+    строку внешнего запроса."""
+    if is_postgresql():
+        return queryset.filter(RawSQL(
+            f'{RECIPE_TABLE}.search_vector @@ {SEARCH_QUERY}', (query,),
+            output_field=BooleanField(),
+        )).annotate(search_rank=RawSQL(
+            f'ts_rank({RECIPE_TABLE}.search_vector, {SEARCH_QUERY})',
+            (query,), output_field=FloatField(),
+        )).order_by(*SEARCH_ORDERING)[:limit]
+    allowed = set(queryset.order_by().values_list('pk', flat=True))
+    ranked = [
+        (pk, score) for pk, score in recipe_index.search(query)
+        if pk in allowed
+    ][:limit]
+    return queryset.filter(
+        pk__in=[pk for pk, _ in ranked]
+    ).annotate(search_rank=Case(
+        *(When(pk=pk, then=Value(score)) for pk, score in ranked),
+        default=Value(0.0), output_field=FloatField(),
+    )).order_by(*SEARCH_ORDERING)
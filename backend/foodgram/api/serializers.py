@@ -8,10 +8,13 @@ from recipes.models import (
 )
 from users.serializers import UserSerializer
 
-from .custom_fields import Base64ImageField
+from .cache import invalidate_recipe_carts
+from .custom_fields import Base64ImageField, RecipeImageField
+from .images import THUMBNAIL
 
 MIN_VALUE = 1
 MAX_VALUE = 32000
+MAX_BULK_SIZE = 100
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -71,7 +74,7 @@ class RecipeReadSerializer(serializers.ModelSerializer):
     author = UserSerializer(
         read_only=True
     )
-    image = Base64ImageField()
+    image = RecipeImageField()
     ingredients = serializers.SerializerMethodField(
         method_name='get_ingredients')
     is_favorited = serializers.SerializerMethodField(
@@ -92,13 +95,19 @@ class RecipeReadSerializer(serializers.ModelSerializer):
         return serializer.data
 
     def get_is_favorited(self, obj):
-        return obj.favorite.filter(
-            user=self.context.get('request').user).exists()
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
+        user = self.context.get('request').user
+        return (user.is_authenticated
+                and obj.favorite.filter(user=user).exists())
 
     def get_is_in_shopping_cart(self, obj):
         """Проверка рецепта на наличие в списке покупок"""
-        return obj.recipe_in_cart.filter(
-            user=self.context.get('request').user).exists()
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
+        user = self.context.get('request').user
+        return (user.is_authenticated
+                and obj.recipe_in_cart.filter(user=user).exists())
 
 
 class RecipeWriteSerializer(serializers.ModelSerializer):
@@ -125,13 +134,26 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         model = Recipe
         exclude = ('pub_date',)
 
+    def validate_ingredients(self, ingredients):
+        """Проверка ингредиентов одним запросом через in_bulk"""
+        ids = [ingredient['id'] for ingredient in ingredients]
+        if len(ids) != len(set(ids)):
+            raise serializers.ValidationError(
+                'Ингредиенты не должны повторяться.')
+        missing = set(ids) - Ingredient.objects.in_bulk(ids).keys()
+        if missing:
+            raise serializers.ValidationError(
+                'Ингредиенты не найдены: '
+                + ', '.join(str(pk) for pk in sorted(missing)))
+        return ingredients
+
     @transaction.atomic
     def tags_and_ingredients_set(self, recipe, tags, ingredients):
         recipe.tags.set(tags)
         AmountIngredient.objects.bulk_create(
             [AmountIngredient(
                 recipe=recipe,
-                ingredient=Ingredient.objects.get(pk=ingredient['id']),
+                ingredient_id=ingredient['id'],
                 amount=ingredient['amount']
             ) for ingredient in ingredients]
         )
@@ -142,27 +164,55 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         ingredients = validated_data.pop('ingredients')
         recipe = Recipe.objects.create(author=self.context['request'].user,
                                        **validated_data)
-        recipe.tags.set(tags)
         self.tags_and_ingredients_set(recipe, tags, ingredients)
         return recipe
 
+    def update_ingredients(self, recipe, ingredients):
+        """Обновление ингредиентов рецепта по разнице со старым набором:
+        вставляются, обновляются и удаляются только изменившиеся строки."""
+        current = {
+            item.ingredient_id: item for item in recipe.amount_recipe.all()}
+        submitted = {
+            ingredient['id']: ingredient['amount']
+            for ingredient in ingredients}
+        removed = current.keys() - submitted.keys()
+        added = [
+            AmountIngredient(
+                recipe=recipe, ingredient_id=ingredient_id, amount=amount)
+            for ingredient_id, amount in submitted.items()
+            if ingredient_id not in current
+        ]
+        changed = []
+        for ingredient_id, item in current.items():
+            amount = submitted.get(ingredient_id)
+            if amount is not None and item.amount != amount:
+                item.amount = amount
+                changed.append(item)
+        if removed:
+            AmountIngredient.objects.filter(
+                recipe=recipe, ingredient_id__in=removed).delete()
+        if added:
+            AmountIngredient.objects.bulk_create(added)
+        if changed:
+            AmountIngredient.objects.bulk_update(changed, ['amount'])
+        if removed or added or changed:
+            transaction.on_commit(
+                lambda: invalidate_recipe_carts(recipe.pk))
+
     @transaction.atomic
     def update(self, instance, validated_data):
-        instance.image = validated_data.get('image', instance.image)
-        instance.name = validated_data.get('name', instance.name)
-        instance.text = validated_data.get('text', instance.text)
-        instance.cooking_time = validated_data.get(
-            'cooking_time', instance.cooking_time)
-        tags = validated_data.pop('tags')
-        ingredients = validated_data.pop('ingredients')
-        AmountIngredient.objects.filter(
-            recipe=instance,
-            ingredient__in=instance.ingredients.all()).delete()
-        self.tags_and_ingredients_set(instance, tags, ingredients)
-        instance.save()
+        tags = validated_data.pop('tags', None)
+        ingredients = validated_data.pop('ingredients', None)
+        instance = super().update(instance, validated_data)
+        if tags is not None:
+            instance.tags.set(tags)
+        if ingredients is not None:
+            self.update_ingredients(instance, ingredients)
         return instance
 
     def to_representation(self, instance):
+        instance = Recipe.objects.with_related().with_user_flags(
+            self.context['request'].user).get(pk=instance.pk)
         return RecipeReadSerializer(instance,
                                     context=self.context).data
 
@@ -171,7 +221,7 @@ class RecipeForCartSerializer(serializers.ModelSerializer):
     '''Сериалайзер для отображения рецепта при запросах
        связаных с корзиной'''
     name = serializers.ReadOnlyField()
-    image = Base64ImageField(read_only=True)
+    image = Base64ImageField(variant=THUMBNAIL, read_only=True)
     cooking_time = serializers.ReadOnlyField()
 
     class Meta:
@@ -184,3 +234,13 @@ class RecipeForCartSerializer(serializers.ModelSerializer):
                 user=self.context.get('request').user).exists():
             raise serializers.ValidationError('Этот рецепт уже добавлен!')
         return attrs
+
+
+class RecipeIdsSerializer(serializers.Serializer):
+    """Список id рецептов для пакетных операций"""
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=MIN_VALUE),
+        allow_empty=False, max_length=MAX_BULK_SIZE)
+
+    def validate_ids(self, ids):
+        return list(dict.fromkeys(ids))
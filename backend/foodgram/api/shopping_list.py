@@ -0,0 +1,139 @@
+import os
+from io import BytesIO
+
+from django.conf import settings
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+FONT_NAME = 'DejaVuSans'
+FONT_PATH = os.path.join(settings.BASE_DIR, 'fonts', 'dejavusans.ttf')
+HEADER_FONT_SIZE = 30
+BODY_INITIAL_FONT_SIZE = 14
+BODY_MIN_FONT_SIZE = 6
+FOOTER_FONT_SIZE = 10
+LINE_WIDTH = 3
+LINE_HEIGHT = 20
+HEADER_X = 40
+HEADER_Y = 760
+BODY_X = 20
+BODY_Y = 720
+BODY_Y_MIN = 80
+FOOTER_X = 40
+FOOTER_Y_FIRST = 50
+FOOTER_Y_SECOND = 30
+PAGE_NUMBER_X = 560
+FILL_COLOR_RED = 0
+FILL_COLOR_GREEN = 0.5
+FILL_COLOR_BLUE = 1
+MAX_TEXT_WIDTH = 400
+BODY_INITIAL_INDEX = 1
+FONT_SIZE_DECREMENT = 1
+LINE_Y_HEADER = 750
+LINE_Y_FOOTER = 65
+LINE_X_HEADER_START = -10
+LINE_X_HEADER_END = 720
+LINE_X_FOOTER_START = -10
+LINE_X_FOOTER_END = 720
+BACKGROUND_FILL_COLOR = colors.HexColor('#D1E6FA')
+BACKGROUND_X = 0
+BACKGROUND_Y = 0
+BACKGROUND_WIDTH = letter[0]
+BACKGROUND_HEIGHT = letter[1]
+
+
+def register_fonts():
+    """Регистрация шрифтов один раз на процесс (вызывается из ApiConfig)"""
+    if FONT_NAME not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(TTFont(FONT_NAME, FONT_PATH))
+
+
+def fit_font_size(text):
+    """Размер шрифта, при котором строка помещается в MAX_TEXT_WIDTH"""
+    font_size = BODY_INITIAL_FONT_SIZE
+    while (font_size > BODY_MIN_FONT_SIZE
+           and pdfmetrics.stringWidth(
+               text, FONT_NAME, font_size) > MAX_TEXT_WIDTH):
+        font_size -= FONT_SIZE_DECREMENT
+    return font_size
+
+
+class ShoppingListPDF:
+    """Многостраничный PDF со списком покупок"""
+
+    def __init__(self, user, ingredients):
+        self.user = user
+        self.ingredients = ingredients
+
+    def render(self, stream=None):
+        """Рисует документ в stream (по умолчанию в BytesIO) и
+        возвращает его, перемотанным в начало."""
+        register_fonts()
+        if stream is None:
+            stream = BytesIO()
+        canva = canvas.Canvas(stream, pagesize=letter)
+        page = 1
+        self.draw_page(canva, page)
+        y = BODY_Y
+        for index, ingredient in enumerate(
+                self.ingredients, BODY_INITIAL_INDEX):
+            if y < BODY_Y_MIN:
+                canva.showPage()
+                page += 1
+                self.draw_page(canva, page)
+                y = BODY_Y
+            self.draw_line_item(canva, y, index, ingredient)
+            y -= LINE_HEIGHT
+        canva.showPage()
+        canva.save()
+        stream.seek(0)
+        return stream
+
+    def draw_page(self, canva, page):
+        self.draw_background(canva)
+        self.draw_header(canva)
+        self.draw_footer(canva, page)
+        self.draw_line(canva)
+
+    def draw_header(self, canva):
+        canva.setFillColorRGB(
+            FILL_COLOR_RED, FILL_COLOR_GREEN, FILL_COLOR_BLUE)
+        canva.setFont(FONT_NAME, HEADER_FONT_SIZE)
+        canva.drawString(
+            HEADER_X, HEADER_Y, f'Список продуктов для {str(self.user)}')
+
+    def draw_line_item(self, canva, y, index, ingredient):
+        text = '{}. {} - {} {}'.format(index, *ingredient)
+        canva.setFont(FONT_NAME, fit_font_size(text))
+        canva.setFillColor(colors.black)
+        canva.drawString(BODY_X, y, text)
+
+    def draw_footer(self, canva, page):
+        canva.setFillColor(colors.black)
+        canva.setFont(FONT_NAME, FOOTER_FONT_SIZE)
+        canva.drawString(FOOTER_X, FOOTER_Y_FIRST, 'Проект: Foodgram')
+        canva.drawString(FOOTER_X, FOOTER_Y_SECOND, 'Версия: v1.0')
+        canva.drawRightString(PAGE_NUMBER_X, FOOTER_Y_SECOND, str(page))
+
+    def draw_line(self, canva):
+        canva.setLineWidth(LINE_WIDTH)
+        canva.line(
+            LINE_X_HEADER_START,
+            LINE_Y_HEADER,
+            LINE_X_HEADER_END,
+            LINE_Y_HEADER)
+        canva.line(
+            LINE_X_FOOTER_START,
+            LINE_Y_FOOTER,
+            LINE_X_FOOTER_END,
+            LINE_Y_FOOTER)
+
+    def draw_background(self, canva):
+        canva.setFillColor(BACKGROUND_FILL_COLOR)
+        canva.rect(
+            BACKGROUND_X,
+            BACKGROUND_Y,
+            BACKGROUND_WIDTH,
+            BACKGROUND_HEIGHT, fill=True, stroke=False)
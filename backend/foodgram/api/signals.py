@@ -0,0 +1,119 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from recipes.models import (AmountIngredient, Favorite, Ingredient, Recipe,
+                            ShoppingCart, Tag)
+from users.models import Follow, User
+
+from .cache import (invalidate_cart, invalidate_feed,
+                    invalidate_ingredient_carts, invalidate_reference,
+                    is_shared_cache)
+from .search import update_search_vectors
+from .tasks import (make_image_variants, render_shopping_cart,
+                    update_ingredient_search)
+
+
+def refresh_cart(user_id):
+    invalidate_cart(user_id)
+    if is_shared_cache():
+        render_shopping_cart.delay(user_id)
+
+
+COUNTER_FIELDS = {
+    Favorite: 'favorites_count',
+    ShoppingCart: 'in_carts_count',
+}
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+def recipe_counter_increment(sender, instance, created, **kwargs):
+    if created:
+        Recipe.objects.filter(pk=instance.recipe_id).change_counter(
+            COUNTER_FIELDS[sender], 1)
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+def recipe_counter_decrement(sender, instance, **kwargs):
+    Recipe.objects.filter(pk=instance.recipe_id).change_counter(
+        COUNTER_FIELDS[sender], -1)
+
+
+@receiver(post_save, sender=Recipe)
+def author_recipes_increment(sender, instance, created, **kwargs):
+    if created:
+        User.objects.filter(pk=instance.author_id).change_counter(
+            'recipes_count', 1)
+
+
+@receiver(post_delete, sender=Recipe)
+def author_recipes_decrement(sender, instance, **kwargs):
+    User.objects.filter(pk=instance.author_id).change_counter(
+        'recipes_count', -1)
+
+
+@receiver(post_save, sender=Follow)
+def author_followers_increment(sender, instance, created, **kwargs):
+    if created:
+        User.objects.filter(pk=instance.author_id).change_counter(
+            'followers_count', 1)
+
+
+@receiver(post_delete, sender=Follow)
+def author_followers_decrement(sender, instance, **kwargs):
+    User.objects.filter(pk=instance.author_id).change_counter(
+        'followers_count', -1)
+
+
+@receiver([post_save, post_delete], sender=Follow)
+def follows_changed(sender, instance, **kwargs):
+    transaction.on_commit(lambda: invalidate_feed(instance.user_id))
+
+
+@receiver([post_save, post_delete], sender=ShoppingCart)
+def shopping_cart_changed(sender, instance, **kwargs):
+    transaction.on_commit(lambda: refresh_cart(instance.user_id))
+
+
+@receiver([post_save, post_delete], sender=Tag)
+@receiver([post_save, post_delete], sender=Ingredient)
+def reference_changed(sender, instance, **kwargs):
+    transaction.on_commit(lambda: invalidate_reference(sender))
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_saved(sender, instance, created, **kwargs):
+    if not created:
+        transaction.on_commit(
+            lambda: invalidate_ingredient_carts(instance.pk))
+        transaction.on_commit(
+            lambda: update_ingredient_search.delay(instance.pk))
+
+
+@receiver(pre_delete, sender=Ingredient)
+def ingredient_deleted(sender, instance, **kwargs):
+    """Строки AmountIngredient удаляются каскадом без сигналов, поэтому
+    корзины и поисковые векторы затронутых рецептов сбрасываются здесь"""
+    recipe_ids = list(AmountIngredient.objects.filter(
+        ingredient=instance).values_list('recipe_id', flat=True))
+    if not recipe_ids:
+        return
+    user_ids = list(ShoppingCart.objects.filter(
+        recipe_id__in=recipe_ids).values_list('user_id', flat=True).distinct())
+    transaction.on_commit(lambda: invalidate_cart(*user_ids))
+    transaction.on_commit(lambda: update_search_vectors(recipe_ids))
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    transaction.on_commit(lambda: update_search_vectors([]))
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, **kwargs):
+    transaction.on_commit(lambda: update_search_vectors([instance.pk]))
+    if instance.image:
+        name = instance.image.name
+        transaction.on_commit(lambda: make_image_variants.delay(name))
@@ -0,0 +1,33 @@
+from django.contrib.auth import get_user_model
+
+from recipes.models import AmountIngredient, Recipe
+from tasks.queue import task
+
+from .cache import get_cart_stream
+from .images import make_variants
+from .renderers import PDFShoppingListRenderer
+from .search import update_search_vectors
+
+
+@task(unique=True)
+def make_image_variants(name):
+    """Уменьшенные копии картинки рецепта. После них рецепты с этой
+    картинкой начинают отдавать ссылки на копии."""
+    make_variants(name)
+    Recipe.objects.filter(image=name).update(image_variants=name)
+
+
+@task(unique=True)
+def render_shopping_cart(user_id):
+    """Прогрев кеша PDF со списком покупок после изменения корзины"""
+    user = get_user_model().objects.filter(pk=user_id).first()
+    if user is not None:
+        for _ in get_cart_stream(user, PDFShoppingListRenderer()):
+            pass
+
+
+@task(unique=True)
+def update_ingredient_search(ingredient_id):
+    """Поисковые векторы рецептов после переименования ингредиента"""
+    update_search_vectors(AmountIngredient.objects.filter(
+        ingredient_id=ingredient_id).values_list('recipe_id', flat=True))
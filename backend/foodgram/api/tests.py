@@ -0,0 +1,600 @@
+import shutil
+import tempfile
+from base64 import b64encode
+from io import BytesIO, StringIO
+from unittest import mock, skipUnless
+
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import F
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from rest_framework.test import APITestCase
+
+from recipes.models import AmountIngredient, Ingredient, Recipe, Tag
+from users.models import User
+
+from .cache import (get_cart_ingredients, get_reference_version,
+                    invalidate_reference)
+from .custom_fields import Base64ImageField
+from .filters import RecipeSearchFilter
+from .images import (IMAGE_VARIANTS, MAX_IMAGE_SIZE, THUMBNAIL,
+                     ImageDecodeError, decode_base64_image, variant_name)
+from .models import ReferenceVersion
+from .search import update_search_vectors
+from .tasks import make_image_variants
+
+RECIPE_IMAGE = 'api/images/recipes/test.png'
+BASE64_IMAGE = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAA'
+    'DUlEQVR42mNk+M9QDwADhgGAWjR9awAAAABJRU5ErkJggg==')
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def query_count(func):
+    with CaptureQueriesContext(connection) as context:
+        func()
+    return len(context.captured_queries)
+
+
+class RecipeTestCase(APITestCase):
+    """Пользователи, тэги и ингредиенты для тестов рецептов"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', email='author@example.com', password='pass')
+        cls.user = User.objects.create_user(
+            username='user', email='user@example.com', password='pass')
+        cls.breakfast = Tag.objects.create(
+            name='Завтрак', color='#E26C2D', slug='breakfast')
+        cls.lunch = Tag.objects.create(
+            name='Обед', color='#49B64E', slug='lunch')
+        Ingredient.objects.bulk_create(
+            Ingredient(name=f'ингредиент {number}', measurement_unit='г')
+            for number in range(60))
+        cls.ingredients = list(Ingredient.objects.order_by('pk'))
+
+    def setUp(self):
+        cache.clear()
+
+    @classmethod
+    def create_recipe(cls, name='Рецепт', tags=(), ingredients=3):
+        recipe = Recipe.objects.create(
+            author=cls.author, name=name, text='Описание',
+            cooking_time=10, image=RECIPE_IMAGE)
+        recipe.tags.set(tags)
+        AmountIngredient.objects.bulk_create(
+            AmountIngredient(recipe=recipe, ingredient=ingredient, amount=5)
+            for ingredient in cls.ingredients[:ingredients])
+        return recipe
+
+
+class RecipeReadQueriesTest(RecipeTestCase):
+    """Число запросов при чтении рецептов не зависит от их количества"""
+
+    def count_list_queries(self, recipes):
+        for number in range(recipes):
+            self.create_recipe(
+                f'Рецепт {number}', (self.breakfast, self.lunch))
+        self.client.force_authenticate(self.user)
+        return query_count(
+            lambda: self.client.get('/api/recipes/', {'limit': 50}))
+
+    def test_list_queries_do_not_grow_with_page_size(self):
+        one = self.count_list_queries(1)
+        Recipe.objects.all().delete()
+        many = self.count_list_queries(20)
+        self.assertEqual(one, many)
+
+    def test_retrieve_queries_do_not_grow_with_ingredients(self):
+        self.client.force_authenticate(self.user)
+        few = self.create_recipe(ingredients=1)
+        lots = self.create_recipe(
+            tags=(self.breakfast, self.lunch), ingredients=20)
+        self.assertEqual(
+            query_count(lambda: self.client.get(f'/api/recipes/{few.pk}/')),
+            query_count(lambda: self.client.get(f'/api/recipes/{lots.pk}/')))
+
+    def test_anonymous_list(self):
+        for number in range(3):
+            self.create_recipe(f'Рецепт {number}')
+        response = self.client.get('/api/recipes/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 3)
+        self.assertFalse(response.data['results'][0]['is_favorited'])
+
+
+class TagFilterTest(RecipeTestCase):
+    """Фильтр по тэгам в режимах any/all и вместе с флагами пользователя"""
+
+    def setUp(self):
+        super().setUp()
+        self.both = self.create_recipe('Оба', (self.breakfast, self.lunch))
+        self.breakfast_only = self.create_recipe('Завтрак', (self.breakfast,))
+        self.untagged = self.create_recipe('Без тэгов')
+        self.client.force_authenticate(self.user)
+
+    def get_ids(self, params):
+        response = self.client.get('/api/recipes/', params)
+        self.assertEqual(response.status_code, 200)
+        ids = [recipe['id'] for recipe in response.data['results']]
+        self.assertEqual(len(ids), response.data['count'])
+        return ids
+
+    def test_no_tags_returns_everything(self):
+        self.assertCountEqual(
+            self.get_ids({}),
+            [self.both.pk, self.breakfast_only.pk, self.untagged.pk])
+
+    def test_any_mode(self):
+        self.assertCountEqual(
+            self.get_ids({'tags': ['breakfast', 'lunch']}),
+            [self.both.pk, self.breakfast_only.pk])
+
+    def test_all_mode(self):
+        self.assertEqual(
+            self.get_ids({'tags': ['breakfast', 'lunch'],
+                          'tags_mode': 'all'}),
+            [self.both.pk])
+
+    def test_no_duplicates_with_user_flags(self):
+        for recipe in (self.both, self.breakfast_only):
+            self.user.lover.create(recipe=recipe)
+            self.user.customer.create(recipe=recipe)
+        params = {'tags': ['breakfast', 'lunch'],
+                  'is_favorited': 1, 'is_in_shopping_cart': 1}
+        self.assertCountEqual(
+            self.get_ids(params), [self.both.pk, self.breakfast_only.pk])
+
+    def test_popular_cursor_falls_back_to_pages(self):
+        Recipe.objects.filter(pk=self.untagged.pk).update(favorites_count=2)
+        Recipe.objects.filter(pk=self.both.pk).update(favorites_count=1)
+        response = self.client.get('/api/recipes/', {
+            'ordering': 'popular', 'pagination': 'cursor'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual(
+            [recipe['id'] for recipe in response.data['results']],
+            [self.untagged.pk, self.both.pk, self.breakfast_only.pk])
+
+    def test_detail_is_not_filtered(self):
+        response = self.client.get(f'/api/recipes/{self.untagged.pk}/')
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class MediaTestCase(RecipeTestCase):
+    """Файлы пишутся во временный MEDIA_ROOT"""
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+
+class RecipeWriteTest(MediaTestCase):
+    """Создание рецепта: число запросов не зависит от числа ингредиентов"""
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.author)
+
+    def post_recipe(self, ingredient_ids):
+        return self.client.post('/api/recipes/', {
+            'name': 'Рецепт',
+            'text': 'Описание',
+            'cooking_time': 10,
+            'image': BASE64_IMAGE,
+            'tags': [self.breakfast.pk],
+            'ingredients': [
+                {'id': pk, 'amount': 5} for pk in ingredient_ids],
+        }, format='json')
+
+    def count_create_queries(self, ingredients):
+        ids = [ingredient.pk for ingredient in self.ingredients[:ingredients]]
+        with CaptureQueriesContext(connection) as context:
+            response = self.post_recipe(ids)
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(len(response.data['ingredients']), ingredients)
+        return len(context.captured_queries)
+
+    def test_create_queries_do_not_grow_with_ingredients(self):
+        self.assertEqual(
+            self.count_create_queries(1), self.count_create_queries(50))
+
+    def count_update_queries(self, removed):
+        recipe = self.create_recipe(ingredients=21)
+        self.user.customer.create(recipe=recipe)
+        kept = [item.pk for item in self.ingredients[:21 - removed]]
+        with CaptureQueriesContext(connection) as context:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.patch(
+                    f'/api/recipes/{recipe.pk}/', {
+                        'tags': [self.breakfast.pk],
+                        'ingredients': [
+                            {'id': pk, 'amount': 5} for pk in kept],
+                    }, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        return len(context.captured_queries)
+
+    def test_update_queries_do_not_grow_with_removed(self):
+        # Первый вызов ставит задачу уменьшенных копий, дальше она
+        # отсеивается как уже ждущая в очереди.
+        self.count_update_queries(1)
+        self.assertEqual(
+            self.count_update_queries(1), self.count_update_queries(20))
+
+    def test_delete_queries_do_not_grow_with_ingredients(self):
+        def count(ingredients):
+            recipe = self.create_recipe(ingredients=ingredients)
+            self.user.customer.create(recipe=recipe)
+            with CaptureQueriesContext(connection) as context:
+                with self.captureOnCommitCallbacks(execute=True):
+                    response = self.client.delete(
+                        f'/api/recipes/{recipe.pk}/')
+            self.assertEqual(response.status_code, 204)
+            return len(context.captured_queries)
+        # Первое удаление создаёт строку версии индекса рецептов.
+        count(1)
+        self.assertEqual(count(1), count(10))
+
+    def test_duplicate_ingredients(self):
+        pk = self.ingredients[0].pk
+        response = self.post_recipe([pk, pk])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('ingredients', response.data)
+
+    def test_missing_ingredients(self):
+        response = self.post_recipe([self.ingredients[0].pk, 10 ** 9])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(str(10 ** 9), str(response.data['ingredients']))
+        self.assertFalse(Recipe.objects.exists())
+
+
+class FeedTest(RecipeTestCase):
+    """Лента подписок всегда идёт от новых рецептов к старым"""
+
+    def setUp(self):
+        super().setUp()
+        self.old = self.create_recipe('Старый')
+        self.new = self.create_recipe('Новый')
+        Recipe.objects.filter(pk=self.old.pk).update(favorites_count=5)
+        self.user.follower.create(author=self.author)
+        self.client.force_authenticate(self.user)
+
+    def test_ordering_is_ignored(self):
+        response = self.client.get(
+            '/api/recipes/feed/', {'ordering': 'popular', 'limit': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['id'], self.new.pk)
+        response = self.client.get(response.data['next'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['id'], self.old.pk)
+
+    def test_position_is_not_a_date(self):
+        cursor = b64encode(b'p=3').decode()
+        response = self.client.get('/api/recipes/feed/', {'cursor': cursor})
+        self.assertEqual(response.status_code, 404)
+
+
+class RecipeSearchTest(RecipeTestCase):
+    """Поиск ограничен самыми релевантными рецептами после фильтров"""
+
+    def setUp(self):
+        super().setUp()
+        self.soup = self.create_recipe('Суп', (self.lunch,))
+        self.soups = self.create_recipe('Суп и суп', (self.breakfast,))
+        self.salad = self.create_recipe('Салат', (self.breakfast,))
+        self.salad.text = 'Подаётся к супу'
+        self.salad.save()
+        update_search_vectors(Recipe.objects.values_list('pk', flat=True))
+
+    def get_ids(self, params):
+        response = self.client.get('/api/recipes/', params)
+        self.assertEqual(response.status_code, 200)
+        ids = [recipe['id'] for recipe in response.data['results']]
+        self.assertEqual(len(ids), response.data['count'])
+        return ids
+
+    def test_ranked(self):
+        self.assertEqual(
+            self.get_ids({'search': 'суп'}),
+            [self.soups.pk, self.soup.pk, self.salad.pk])
+
+    def test_cursor_keeps_rank_ordering(self):
+        self.assertEqual(
+            self.get_ids({'search': 'суп', 'pagination': 'cursor'}),
+            [self.soups.pk, self.soup.pk, self.salad.pk])
+
+    @mock.patch.object(RecipeSearchFilter, 'results_limit', 2)
+    def test_limit_is_applied_after_filters(self):
+        self.assertEqual(
+            self.get_ids({'search': 'суп'}), [self.soups.pk, self.soup.pk])
+        self.assertEqual(
+            self.get_ids({'search': 'суп', 'tags': ['breakfast']}),
+            [self.soups.pk, self.salad.pk])
+
+    def test_detail_ignores_search(self):
+        response = self.client.get(
+            f'/api/recipes/{self.soup.pk}/', {'search': 'салат'})
+        self.assertEqual(response.status_code, 200)
+
+    @skipUnless(connection.vendor == 'postgresql', 'нужен PostgreSQL')
+    @mock.patch.object(RecipeSearchFilter, 'results_limit', 2)
+    def test_postgresql_query_is_not_correlated(self):
+        with CaptureQueriesContext(connection) as context:
+            self.get_ids({'search': 'суп', 'tags': ['breakfast']})
+        for query in context.captured_queries:
+            if 'search_vector' in query['sql']:
+                self.assertNotRegex(query['sql'], r'"recipes_recipe" U\d')
+                self.assertEqual(query['sql'].count('search_vector @@'), 1)
+
+
+class LoadIngredientsTest(RecipeTestCase):
+    """Загрузка ингредиентов из JSON"""
+
+    def load(self, text, suffix='.json'):
+        with tempfile.NamedTemporaryFile(
+                'w', suffix=suffix, encoding='utf-8') as file:
+            file.write(text)
+            file.flush()
+            call_command('load_ingredients', file.name, stdout=StringIO())
+
+    def test_load(self):
+        version = get_reference_version(Ingredient)
+        self.load('[{"name": "соль", "measurement_unit": "г"}]')
+        self.assertTrue(Ingredient.objects.filter(name='соль').exists())
+        # Версия в базе: веб-процессы с локальным кешем тоже её увидят.
+        cache.clear()
+        self.assertNotEqual(get_reference_version(Ingredient), version)
+
+    def test_invalid_json(self):
+        for text in (
+            '[{"name": "соль", "measurement_unit": "г"}',
+            '[{"name": "соль", "measurement_unit": "г"}, {"name": ',
+            '[{"name": "соль", "measurement_unit": "г"}, {"name": "перец"}]',
+            '[{"name": "соль", "measurement_unit": "г"}] []',
+            '[{"name": "соль", "measurement_unit": "г"},]',
+            '[{"name": "соль", "measurement_unit": "г"} {"name": "перец"}]',
+        ):
+            with self.subTest(text=text):
+                with self.assertRaises(CommandError):
+                    self.load(text)
+                self.assertFalse(
+                    Ingredient.objects.filter(name='соль').exists())
+
+    def test_load_csv(self):
+        self.load('name,measurement_unit\nсоль,г\n\nперец, г\n', '.csv')
+        self.assertEqual(
+            Ingredient.objects.filter(name__in=('соль', 'перец')).count(), 2)
+
+    def test_invalid_csv(self):
+        for text in ('соль,г\nперец\n', 'соль,г,щепотка\n', 'соль,\n'):
+            with self.subTest(text=text):
+                with self.assertRaises(CommandError):
+                    self.load(text, '.csv')
+                self.assertFalse(
+                    Ingredient.objects.filter(name='соль').exists())
+
+
+class CounterFieldsTest(RecipeTestCase):
+    """Полное сохранение записи не затирает счётчики"""
+
+    def test_recipe_save_keeps_counters(self):
+        recipe = self.create_recipe()
+        Recipe.objects.filter(pk=recipe.pk).update(
+            favorites_count=5, in_carts_count=3)
+        recipe.name = 'Новое название'
+        recipe.save()
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.name, 'Новое название')
+        self.assertEqual(
+            (recipe.favorites_count, recipe.in_carts_count), (5, 3))
+
+    def test_user_save_keeps_counters(self):
+        User.objects.filter(pk=self.author.pk).update(
+            recipes_count=4, followers_count=2)
+        self.author.set_password('new-pass')
+        self.author.save()
+        self.author.refresh_from_db()
+        self.assertTrue(self.author.check_password('new-pass'))
+        self.assertEqual(
+            (self.author.recipes_count, self.author.followers_count), (4, 2))
+
+
+class IngredientCacheTest(RecipeTestCase):
+    """Список ингредиентов кешируется одним обращением к кешу"""
+
+    def test_list_is_cached_once(self):
+        with mock.patch('api.mixins.registry') as registry:
+            response = self.client.get('/api/ingredients/')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data), len(self.ingredients))
+            registry.cache_lookup.assert_called_once_with('reference', False)
+        self.assertEqual(
+            query_count(lambda: self.client.get('/api/ingredients/')), 0)
+
+
+class BulkChangeTest(RecipeTestCase):
+    """Пакетное избранное меняет счётчики только по изменённым связям"""
+
+    def setUp(self):
+        super().setUp()
+        self.first = self.create_recipe('Первый')
+        self.second = self.create_recipe('Второй')
+        self.user.lover.create(recipe=self.first)
+        self.client.force_authenticate(self.user)
+
+    def change(self, method, ids):
+        response = getattr(self.client, method)(
+            '/api/recipes/favorite/', {'ids': ids}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return [item['status'] for item in response.data['results']]
+
+    def favorites_count(self):
+        return list(Recipe.objects.filter(
+            pk__in=(self.first.pk, self.second.pk)
+        ).order_by('pk').values_list('favorites_count', flat=True))
+
+    def test_add_and_remove(self):
+        ids = [self.first.pk, self.second.pk, 10 ** 9]
+        self.assertEqual(
+            self.change('post', ids), ['exists', 'added', 'not_found'])
+        self.assertEqual(self.favorites_count(), [1, 1])
+        self.assertEqual(
+            self.change('delete', ids), ['removed', 'removed', 'not_found'])
+        self.assertEqual(self.favorites_count(), [0, 0])
+        self.assertEqual(
+            self.change('delete', ids), ['absent', 'absent', 'not_found'])
+        self.assertEqual(self.favorites_count(), [0, 0])
+
+
+class ReferenceVersionTest(RecipeTestCase):
+    """Версия справочника хранится в базе и переживает сброс кеша"""
+
+    def test_version_survives_cache_clear(self):
+        version = get_reference_version(Tag)
+        cache.clear()
+        self.assertEqual(get_reference_version(Tag), version)
+
+    def test_invalidate_changes_version(self):
+        version = get_reference_version(Tag)
+        invalidate_reference(Tag)
+        self.assertNotEqual(get_reference_version(Tag)[0], version[0])
+
+    def test_change_from_other_process_is_seen(self):
+        version = get_reference_version(Tag)
+        ReferenceVersion.objects.filter(label='recipes.tag').update(
+            version=F('version') + 1)
+        self.assertEqual(get_reference_version(Tag), version)
+        # Истечение REFERENCE_VERSION_TIMEOUT в этом процессе.
+        cache.delete('reference:recipes.tag:version')
+        self.assertNotEqual(get_reference_version(Tag), version)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'EXPLAIN для PostgreSQL')
+class QueryPlanTest(RecipeTestCase):
+    """Горячие запросы API идут по индексам, а не последовательным
+    сканированием. enable_seqscan выключается, чтобы на маленькой
+    тестовой базе планировщик выбирал индекс, если он подходит."""
+
+    def setUp(self):
+        super().setUp()
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def test_hot_queries_use_indexes(self):
+        recipes = Recipe.objects.only('id')
+        user_id = self.user.pk
+        queries = {
+            'Лента рецептов': recipes.order_by('-pub_date', '-id')[:6],
+            'Рецепты автора': recipes.filter(
+                author_id=self.author.pk).order_by('-pub_date')[:6],
+            'Популярные рецепты': recipes.order_by(
+                '-favorites_count', '-pub_date', '-id')[:6],
+            'Рецепты по тэгу': recipes.filter(tags__slug='breakfast'),
+            'Избранное': recipes.filter(favorite__user_id=user_id),
+            'Список покупок': recipes.filter(recipe_in_cart__user_id=user_id),
+            'Поиск ингредиента': Ingredient.objects.filter(
+                name__istartswith='мол'),
+        }
+        for name, queryset in queries.items():
+            with self.subTest(name):
+                self.assertNotIn('Seq Scan', queryset.explain())
+
+
+def image_data(image_format='PNG', size=(2000, 1000)):
+    buffer = BytesIO()
+    Image.new('RGB', size, '#E26C2D').save(buffer, image_format)
+    encoded = b64encode(buffer.getvalue()).decode()
+    return f'data:image/{image_format.lower()};base64,{encoded}'
+
+
+class ImageTest(MediaTestCase):
+    """Декодирование картинок и уменьшенные копии"""
+
+    def test_decode(self):
+        image = decode_base64_image(image_data(), 'picture')
+        self.assertEqual(image.name, 'picture.png')
+        self.assertEqual(Image.open(image).size, (2000, 1000))
+
+    def test_invalid_images(self):
+        payloads = {
+            'oversized': image_data(),
+            'corrupt': 'data:image/png;base64,' + b64encode(
+                b'\x89PNG\r\n\x1a\n' + b'\x00' * 64).decode(),
+            'not an image': 'data:image/png;base64,' + b64encode(
+                b'<html></html>').decode(),
+            'not base64': 'data:image/png;base64,@@@@',
+            'unsupported format': image_data('BMP', (10, 10)),
+        }
+        for name, payload in payloads.items():
+            with self.subTest(name), mock.patch(
+                    'api.images.MAX_IMAGE_SIZE',
+                    1000 if name == 'oversized' else MAX_IMAGE_SIZE):
+                with self.assertRaises(ImageDecodeError):
+                    decode_base64_image(payload, 'picture')
+
+    def test_invalid_image_is_rejected_by_api(self):
+        self.client.force_authenticate(self.author)
+        response = self.client.post('/api/recipes/', {
+            'name': 'Рецепт', 'text': 'Описание', 'cooking_time': 10,
+            'image': 'data:image/png;base64,' + b64encode(b'text').decode(),
+            'tags': [self.breakfast.pk],
+            'ingredients': [{'id': self.ingredients[0].pk, 'amount': 5}],
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('image', response.data)
+
+    def test_variants(self):
+        name = default_storage.save(
+            'api/images/recipes/variants.png',
+            decode_base64_image(image_data(), 'variants'))
+        recipe = self.create_recipe()
+        Recipe.objects.filter(pk=recipe.pk).update(image=name)
+        recipe.refresh_from_db()
+        field = Base64ImageField(variant=THUMBNAIL)
+        self.assertEqual(
+            field.to_representation(recipe.image), recipe.image.url)
+        make_image_variants(name)
+        for variant, size in IMAGE_VARIANTS.items():
+            with default_storage.open(variant_name(name, variant)) as file:
+                with Image.open(file) as image:
+                    self.assertEqual(image.format, 'WEBP')
+                    self.assertEqual(image.width, size[0])
+                    self.assertLessEqual(image.height, size[1])
+        recipe.refresh_from_db()
+        with CaptureQueriesContext(connection) as context:
+            url = field.to_representation(recipe.image)
+        self.assertEqual(url, default_storage.url(
+            variant_name(name, THUMBNAIL)))
+        self.assertEqual(len(context.captured_queries), 0)
+
+
+class ShoppingCartCacheTest(RecipeTestCase):
+    """Кеш корзины сбрасывается при изменении ингредиента"""
+
+    def test_ingredient_rename_invalidates_cart(self):
+        recipe = self.create_recipe(ingredients=1)
+        self.user.customer.create(recipe=recipe)
+        ingredient = self.ingredients[0]
+        self.assertEqual(
+            get_cart_ingredients(self.user), [(ingredient.name, 5, 'г')])
+        ingredient.name = 'соль'
+        with self.captureOnCommitCallbacks(execute=True):
+            ingredient.save()
+        self.assertEqual(get_cart_ingredients(self.user), [('соль', 5, 'г')])
+
+    def test_ingredient_delete_invalidates_cart(self):
+        recipe = self.create_recipe(ingredients=2)
+        self.user.customer.create(recipe=recipe)
+        self.assertEqual(len(get_cart_ingredients(self.user)), 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.ingredients[0].delete()
+        self.assertEqual(
+            get_cart_ingredients(self.user),
+            [(self.ingredients[1].name, 5, 'г')])
@@ -2,7 +2,8 @@ from django.urls import include, path
 
 from rest_framework.routers import DefaultRouter
 
-from api.views import IngridientViewSet, RecipeViewSet, TagViewSet
+from api.views import (IngridientViewSet, MetricsView, RecipeViewSet,
+                       TagViewSet)
 from users.views import UserViewSet
 
 app_name = 'api'
@@ -16,4 +17,5 @@ router.register('recipes', RecipeViewSet, basename='recipes')
 urlpatterns = [
     path('', include(router.urls)),
     path('auth/', include('djoser.urls.authtoken')),
+    path('metrics', MetricsView.as_view(), name='metrics'),
 ]
@@ -1,67 +1,45 @@
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.db import transaction
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.permissions import IsAuthenticated, AllowAny
 
-from rest_framework import filters, status, viewsets
+from rest_framework import status, viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
-
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.pdfgen import canvas
+from rest_framework.views import APIView
 
 from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
 
-from users.permissions import Admin, AuthUser, Guest
+from users.permissions import Admin, AuthUser, Guest, MetricsAllowlist
 from users.serializers import RecipeForFlollowSerializer
 
-from .filters import IngredientFilter, TagFilter
+from .cache import get_cart_stream
+from .feed import get_feed_queryset
+from .filters import IngredientFilter, RecipeSearchFilter, TagFilter
+from .ingredient_index import ingredient_index
+from .metrics import CONTENT_TYPE, registry
+from .mixins import ReferenceCacheMixin
+from .pagination import RecipeCursorPagination
+from .renderers import SHOPPING_LIST_RENDERERS
 from .serializers import (
-    AmountIngredient,
     IngredientSerializer,
+    RecipeIdsSerializer,
     RecipeReadSerializer,
     RecipeWriteSerializer,
     TagSerializer,
     RecipeForCartSerializer,
 )
+from .signals import COUNTER_FIELDS, refresh_cart
+
+BULK_ADDED = 'added'
+BULK_EXISTS = 'exists'
+BULK_REMOVED = 'removed'
+BULK_ABSENT = 'absent'
+BULK_NOT_FOUND = 'not_found'
+
 
-HEADER_FONT_SIZE = 30
-BODY_INITIAL_FONT_SIZE = 14
-FOOTER_FONT_SIZE = 10
-LINE_WIDTH = 3
-LINE_HEIGHT = 20
-HEADER_X = 40
-HEADER_Y = 760
-BODY_X = 20
-BODY_Y = 720
-FOOTER_X = 40
-FOOTER_Y_FIRST = 50
-FOOTER_Y_SECOND = 30
-FILL_COLOR_RED = 0
-FILL_COLOR_GREEN = 0.5
-FILL_COLOR_BLUE = 1
-MAX_TEXT_WIDTH = 400
-BODY_INITIAL_INDEX = 1
-BODY_INCREMENT_INDEX = 1
-FONT_SIZE_DECREMENT = 1
-LINE_Y_HEADER = 750
-LINE_Y_FOOTER = 65
-LINE_X_HEADER_START = -10
-LINE_X_HEADER_END = 720
-LINE_X_FOOTER_START = -10
-LINE_X_FOOTER_END = 720
-BACKGROUND_FILL_COLOR = colors.HexColor('#D1E6FA')
-BACKGROUND_X = 0
-BACKGROUND_Y = 0
-BACKGROUND_WIDTH = letter[0]
-BACKGROUND_HEIGHT = letter[1]
-
-
-class TagViewSet(viewsets.ModelViewSet):
+class TagViewSet(ReferenceCacheMixin, viewsets.ModelViewSet):
     """Вьюсет для Тэга"""
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
@@ -74,7 +52,7 @@ class TagViewSet(viewsets.ModelViewSet):
         return [Admin()]
 
 
-class IngridientViewSet(viewsets.ModelViewSet):
+class IngridientViewSet(ReferenceCacheMixin, viewsets.ModelViewSet):
     """Вьюсет для Ингредиента"""
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
@@ -82,6 +60,19 @@ class IngridientViewSet(viewsets.ModelViewSet):
     filterset_class = IngredientFilter
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(self.search, request, *args, **kwargs)
+
+    def search(self, request, *args, **kwargs):
+        """Поиск по ?name= через индекс в памяти: сначала совпадения
+        по началу названия, затем по подстроке."""
+        name = request.query_params.get('name')
+        if not name:
+            return viewsets.ModelViewSet.list(self, request, *args, **kwargs)
+        serializer = self.get_serializer(
+            ingredient_index.search(name), many=True)
+        return Response(serializer.data)
+
     def get_permissions(self):
         if self.request.method == 'GET':
             return [Guest() or AuthUser() or Admin()]
@@ -91,8 +82,6 @@ class IngridientViewSet(viewsets.ModelViewSet):
 class RecipeViewSet(viewsets.ModelViewSet):
     """Вьюсет для Рецепта"""
     queryset = Recipe.objects.all()
-    filter_backends = (filters.SearchFilter,)
-    search_fields = ('name',)
     permission_classes_by_action = {
         'create': [Admin | AuthUser],
         'list': [AllowAny],
@@ -101,13 +90,31 @@ class RecipeViewSet(viewsets.ModelViewSet):
         'favorite': [Admin | AuthUser],
         'shopping_cart': [Admin | AuthUser],
         'download_shopping_cart': [Admin | AuthUser],
+        'feed': [Admin | AuthUser],
+        'favorite_bulk': [Admin | AuthUser],
+        'shopping_cart_bulk': [Admin | AuthUser],
     }
     http_method_names = ['get', 'post', 'patch', 'delete']
-    filter_backends = (DjangoFilterBackend,)
+    filter_backends = (DjangoFilterBackend, RecipeSearchFilter)
     filterset_class = TagFilter
 
+    @property
+    def paginator(self):
+        if (not hasattr(self, '_paginator')
+                and (self.action == 'feed'
+                     or self.action == 'list'
+                     and RecipeCursorPagination.is_requested(self.request))):
+            self._paginator = RecipeCursorPagination()
+        return super().paginator
+
+    def get_queryset(self):
+        if self.action in ['list', 'retrieve', 'feed']:
+            return Recipe.objects.with_related().with_user_flags(
+                self.request.user)
+        return super().get_queryset()
+
     def get_serializer_class(self):
-        if self.action in ['list', 'retrieve']:
+        if self.action in ['list', 'retrieve', 'feed']:
             return RecipeReadSerializer
         return RecipeWriteSerializer
 
@@ -160,79 +167,80 @@ class RecipeViewSet(viewsets.ModelViewSet):
         return Response({'detail': 'Ошибка'},
                         status=status.HTTP_400_BAD_REQUEST)
 
+    @action(detail=False, methods=['post', 'delete'], url_path='favorite')
+    def favorite_bulk(self, request):
+        """Добавление и удаление нескольких рецептов в избранном"""
+        return self.bulk_change(request, Favorite)
+
+    @action(detail=False, methods=['post', 'delete'],
+            url_path='shopping_cart')
+    def shopping_cart_bulk(self, request):
+        """Добавление и удаление нескольких рецептов в списке покупок"""
+        return self.bulk_change(request, ShoppingCart)
+
+    def bulk_change(self, request, model):
+        """Пакетное изменение связей пользователя с рецептами из ids.
+
+        Существование рецептов проверяется одним запросом, затем
+        выполняются один INSERT или DELETE с RETURNING и один UPDATE
+        счётчика ровно по тем рецептам, связи с которыми изменились.
+        Сигналы при этом не срабатывают, поэтому счётчики и кеш списка
+        покупок обновляются здесь же. Ответ - статус по каждому id."""
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['ids']
+        user = request.user
+        found = set(
+            Recipe.objects.filter(pk__in=ids).values_list('pk', flat=True))
+        existing = [pk for pk in ids if pk in found]
+        adding = request.method == 'POST'
+        with transaction.atomic():
+            if adding:
+                changed = model.objects.add_recipes(user, existing)
+            else:
+                changed = model.objects.remove_recipes(user, existing)
+            Recipe.objects.filter(pk__in=changed).change_counter(
+                COUNTER_FIELDS[model], 1 if adding else -1)
+            if changed and model is ShoppingCart:
+                transaction.on_commit(lambda: refresh_cart(user.pk))
+        changed = set(changed)
+        done, unchanged = (
+            (BULK_ADDED, BULK_EXISTS) if adding
+            else (BULK_REMOVED, BULK_ABSENT))
+        return Response({'results': [
+            {
+                'id': pk,
+                'status': (
+                    BULK_NOT_FOUND if pk not in found
+                    else done if pk in changed
+                    else unchanged),
+            }
+            for pk in ids
+        ]})
+
     @action(detail=False)
+    def feed(self, request):
+        """Лента рецептов авторов из подписок с курсорной пагинацией"""
+        page = self.paginate_queryset(get_feed_queryset(
+            request, self.get_queryset(), self.paginator))
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=False, renderer_classes=SHOPPING_LIST_RENDERERS)
     def download_shopping_cart(self, request):
-        """Создания списка покупок"""
-        user = request.user
-        ingredients = (
-            AmountIngredient.objects
-            .filter(recipe__recipe_in_cart__user=user)
-            .values('ingredient')
-            .annotate(total=Sum('amount'))
-            .values_list(
-                'ingredient__name', 'total', 'ingredient__measurement_unit')
-        )
-        response = HttpResponse(content_type='application/pdf')
-        response[
-            'Content-Disposition'] = 'attachment; filename="shopping_cart.pdf"'
-        pdfmetrics.registerFont(TTFont('DejaVuSans', 'dejavusans.ttf'))
-        canva = canvas.Canvas(response, pagesize=letter)
-
-        self.draw_background(canva)
-        self.draw_header(canva, user)
-        self.draw_body(canva, ingredients)
-        self.draw_footer(canva)
-        self.draw_line(canva)
-        canva.showPage()
-        canva.save()
+        """Создания списка покупок в формате из ?format= или Accept"""
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            get_cart_stream(request.user, renderer),
+            content_type=renderer.content_type)
+        response['Content-Disposition'] = (
+            f'attachment; filename="shopping_cart.{renderer.format}"')
         return response
 
-    def draw_header(self, canva, user):
-        canva.setFillColorRGB(
-            FILL_COLOR_RED, FILL_COLOR_GREEN, FILL_COLOR_BLUE)
-        canva.setFont('DejaVuSans', HEADER_FONT_SIZE)
-        canva.drawString(
-            HEADER_X, HEADER_Y, f'Список продуктов для {str(user)}')
-
-    def draw_body(self, canva, ingredients):
-        x = BODY_X
-        y = BODY_Y
-        i = BODY_INITIAL_INDEX
-        font_size = BODY_INITIAL_FONT_SIZE
-
-        canva.setFont('DejaVuSans', font_size)
-        canva.setFillColor(colors.black)
-        for ingredient in ingredients:
-            text = '{}. {} - {} {}'.format(i, *ingredient)
-            while canva.stringWidth(text) > MAX_TEXT_WIDTH:
-                font_size -= FONT_SIZE_DECREMENT
-                canva.setFont('DejaVuSans', font_size)
-            canva.drawString(x, y, text)
-            y -= LINE_HEIGHT
-            i += BODY_INCREMENT_INDEX
-
-    def draw_footer(self, canva):
-        canva.setFont('DejaVuSans', FOOTER_FONT_SIZE)
-        canva.drawString(FOOTER_X, FOOTER_Y_FIRST, 'Проект: Foodgram')
-        canva.drawString(FOOTER_X, FOOTER_Y_SECOND, 'Версия: v1.0')
-
-    def draw_line(self, canva):
-        canva.setLineWidth(LINE_WIDTH)
-        canva.line(
-            LINE_X_HEADER_START,
-            LINE_Y_HEADER,
-            LINE_X_HEADER_END,
-            LINE_Y_HEADER)
-        canva.line(
-            LINE_X_FOOTER_START,
-            LINE_Y_FOOTER,
-            LINE_X_FOOTER_END,
-            LINE_Y_FOOTER)
-
-    def draw_background(self, canva):
-        canva.setFillColor(BACKGROUND_FILL_COLOR)
-        canva.rect(
-            BACKGROUND_X,
-            BACKGROUND_Y,
-            BACKGROUND_WIDTH,
-            BACKGROUND_HEIGHT, fill=True, stroke=False)
+
+class MetricsView(APIView):
+    """Метрики процесса в текстовом формате Prometheus"""
+    permission_classes = (Admin | MetricsAllowlist,)
+
+    def get(self, request):
+        return HttpResponse(registry.export(), content_type=CONTENT_TYPE)
@@ -32,6 +32,7 @@ INSTALLED_APPS = [
     'djoser',
     'api.apps.ApiConfig',
     'users.apps.UsersConfig',
+    'tasks.apps.TasksConfig',
     'corsheaders',
 ]
 
@@ -44,6 +45,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.middleware.RequestTimingMiddleware',
 ]
 
 ROOT_URLCONF = 'foodgram.urls'
@@ -80,6 +82,39 @@ DATABASES = {
     }
 }
 
+# Локальный кеш по умолчанию. При нескольких процессах gunicorn нужен общий
+# бэкенд (например, Redis или Memcached), иначе сброс кеша не дойдёт
+# до остальных воркеров.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+# Выполнять фоновые задачи сразу, без очереди и обработчика run_tasks.
+TASKS_ALWAYS_EAGER = os.getenv('TASKS_ALWAYS_EAGER', 'False') == 'True'
+# Через сколько секунд выполняемая задача считается зависшей и
+# возвращается в очередь (должно быть больше времени самой долгой задачи),
+# сколько раз задача запускается до статуса failed и сколько дней
+# хранятся выполненные задачи.
+TASK_TIMEOUT = int(os.getenv('TASK_TIMEOUT', '600'))
+TASK_MAX_ATTEMPTS = int(os.getenv('TASK_MAX_ATTEMPTS', '3'))
+TASK_RETENTION_DAYS = int(os.getenv('TASK_RETENTION_DAYS', '7'))
+
+# Доля запросов с подсчётом SQL и заголовком Server-Timing (от 0 до 1)
+# и порог, после которого запрос пишется в лог как медленный.
+REQUEST_TIMING_SAMPLE_RATE = float(
+    os.getenv('REQUEST_TIMING_SAMPLE_RATE', '0.1'))
+SLOW_REQUEST_MS = int(os.getenv('SLOW_REQUEST_MS', '500'))
+
+# Адреса сборщика метрик, которым /api/metrics доступен без авторизации.
+METRICS_ALLOWED_IPS = [
+    ip.strip() for ip in os.getenv('METRICS_ALLOWED_IPS', '').split(',')
+    if ip.strip()
+]
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -1,4 +1,7 @@
 from django.contrib import admin
+from django.db import transaction
+
+from api.cache import invalidate_recipe_carts
 
 from .models import (
     AmountIngredient,
@@ -28,13 +31,18 @@ class TagAdmin(admin.ModelAdmin):
 
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
-    list_display = ('name', 'author', 'favorite_count',)
+    list_display = ('name', 'author', 'favorites_count', 'in_carts_count',)
     list_filter = ('author', 'name', 'tags',)
+    readonly_fields = ('favorites_count', 'in_carts_count',)
     inlines = (AmountIngredientInline,)
 
-    @admin.display(description='В избранном')
-    def favorite_count(self, obj):
-        return obj.favorite.count()
+    def save_related(self, request, form, formsets, change):
+        """У AmountIngredient нет сигналов, поэтому корзины с рецептом
+        сбрасываются после сохранения ингредиентов из инлайна"""
+        super().save_related(request, form, formsets, change)
+        if change:
+            recipe_id = form.instance.pk
+            transaction.on_commit(lambda: invalidate_recipe_carts(recipe_id))
 
 
 @admin.register(Favorite)
@@ -0,0 +1,52 @@
+# Generated by Django 3.2.18 on 2026-10-18 03:20
+
+from django.db import migrations
+
+SEARCH_INDEX = 'recipe_search_vector_idx'
+# Копия api.search.UPDATE_SEARCH_VECTOR без фильтра по id: миграция
+# заполняет вектор всех существующих рецептов.
+FILL_SEARCH_VECTOR = '''
+    UPDATE recipes_recipe AS recipe SET search_vector =
+        setweight(to_tsvector('russian', recipe.name), 'A')
+        || setweight(to_tsvector('russian', coalesce((
+            SELECT string_agg(ingredient.name, ' ')
+            FROM recipes_amountingredient AS amount
+            JOIN recipes_ingredient AS ingredient
+                ON ingredient.id = amount.ingredient_id
+            WHERE amount.recipe_id = recipe.id), '')), 'B')
+        || setweight(to_tsvector('russian', recipe.text), 'C')
+'''
+
+
+def add_search_vector(apps, schema_editor):
+    """Колонка tsvector с GIN-индексом для полнотекстового поиска.
+    Колонка не объявлена в модели, при миграции заполняется для всех
+    рецептов, дальше её обновляет api.search."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'ALTER TABLE recipes_recipe '
+        'ADD COLUMN IF NOT EXISTS search_vector tsvector')
+    schema_editor.execute(FILL_SEARCH_VECTOR)
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS {SEARCH_INDEX} '
+        'ON recipes_recipe USING gin (search_vector)')
+
+
+def drop_search_vector(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS {SEARCH_INDEX}')
+    schema_editor.execute(
+        'ALTER TABLE recipes_recipe DROP COLUMN IF EXISTS search_vector')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_search_vector, drop_search_vector),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 3.2.18 on 2026-10-18 03:40
+
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+
+from api.images import IMAGE_VARIANTS, variant_name
+
+
+def mark_existing_variants(apps, schema_editor):
+    """Один проход по хранилищу: отмечаются картинки, копии которых
+    уже созданы"""
+    Recipe = apps.get_model('recipes', 'Recipe')
+    names = Recipe.objects.exclude(image='').exclude(
+        image__isnull=True).values_list('image', flat=True).distinct()
+    ready = [
+        name for name in names.iterator()
+        if all(default_storage.exists(variant_name(name, variant))
+               for variant in IMAGE_VARIANTS)
+    ]
+    Recipe.objects.filter(image__in=ready).update(
+        image_variants=models.F('image'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0012_recipe_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_variants',
+            field=models.CharField(blank=True, editable=False, max_length=100, verbose_name='Картинка с готовыми копиями'),
+        ),
+        migrations.RunPython(mark_existing_variants, migrations.RunPython.noop),
+    ]
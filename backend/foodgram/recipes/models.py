@@ -1,10 +1,126 @@
-from django.db import models
+from django.db import connections, models
+from django.db.models.functions import Coalesce
 
 from foodgram.settings import AUTH_USER_MODEL
 
 CHARACTER_SLICE = 20
 
 
+class CounterFieldsMixin:
+    """Денормализованные счётчики из counter_fields меняются только
+    UPDATE-ами change_counter и recalculate_counters. save() существующей
+    записи без update_fields их не пишет, иначе затёр бы их значениями,
+    прочитанными до последнего изменения."""
+    counter_fields = ()
+
+    def save(self, *args, update_fields=None, **kwargs):
+        if update_fields is None and not self._state.adding:
+            skip = set(self.counter_fields) | self.get_deferred_fields()
+            update_fields = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in skip and field.attname not in skip
+            ]
+        super().save(*args, update_fields=update_fields, **kwargs)
+
+
+class RecipeQuerySet(models.QuerySet):
+    """Кверисет Рецепта с выборками для чтения"""
+
+    def with_related(self):
+        """Подтягивает автора, тэги и ингредиенты за фиксированное
+        число запросов, независимо от количества рецептов."""
+        return self.select_related('author').prefetch_related(
+            'tags',
+            models.Prefetch(
+                'amount_recipe',
+                queryset=AmountIngredient.objects.select_related(
+                    'ingredient')),
+        )
+
+    def latest_per_author(self, limit):
+        """Оставляет не более limit последних рецептов каждого автора.
+        Отбор делается коррелированным подзапросом в том же запросе."""
+        latest = self.model.objects.filter(
+            author=models.OuterRef('author')
+        ).order_by('-pub_date', '-pk').values('pk')[:limit]
+        return self.filter(pk__in=models.Subquery(latest))
+
+    def with_user_flags(self, user):
+        """Аннотирует is_favorited и is_in_shopping_cart для пользователя.
+        Для анонима оба флага равны False без подзапросов."""
+        if not user.is_authenticated:
+            return self.annotate(
+                is_favorited=models.Value(
+                    False, output_field=models.BooleanField()),
+                is_in_shopping_cart=models.Value(
+                    False, output_field=models.BooleanField()),
+            )
+        return self.annotate(
+            is_favorited=models.Exists(Favorite.objects.filter(
+                user=user, recipe=models.OuterRef('pk'))),
+            is_in_shopping_cart=models.Exists(ShoppingCart.objects.filter(
+                user=user, recipe=models.OuterRef('pk'))),
+        )
+
+    def change_counter(self, field, delta):
+        """Атомарно меняет счётчик на delta одним UPDATE с F().
+        Счётчик не уходит ниже нуля."""
+        queryset = self
+        if delta < 0:
+            queryset = queryset.filter(**{f'{field}__gte': -delta})
+        return queryset.update(**{field: models.F(field) + delta})
+
+    def recalculate_counters(self):
+        """Пересчитывает favorites_count и in_carts_count одним UPDATE
+        с подзапросами COUNT"""
+        def count(model):
+            return Coalesce(models.Subquery(
+                model.objects.filter(recipe=models.OuterRef('pk'))
+                .order_by().values('recipe')
+                .annotate(total=models.Count('pk')).values('total'),
+                output_field=models.PositiveIntegerField()), 0)
+        return self.update(
+            favorites_count=count(Favorite),
+            in_carts_count=count(ShoppingCart),
+        )
+
+
+class UserRecipeQuerySet(models.QuerySet):
+    """Кверисет связей пользователя с рецептами (избранное, корзина).
+
+    Пакетные методы работают одним запросом с RETURNING (PostgreSQL,
+    SQLite 3.35+) и возвращают id рецептов, связи с которыми
+    действительно созданы или удалены. Сигналы не отправляются."""
+
+    def add_recipes(self, user, recipe_ids):
+        values = ', '.join(['(%s, %s)'] * len(recipe_ids))
+        return self.returning_recipes(
+            'INSERT INTO {table} ({user}, {recipe}) VALUES ' + values
+            + ' ON CONFLICT ({user}, {recipe}) DO NOTHING'
+            ' RETURNING {recipe}',
+            [param for pk in recipe_ids for param in (user.pk, pk)])
+
+    def remove_recipes(self, user, recipe_ids):
+        placeholders = ', '.join(['%s'] * len(recipe_ids))
+        return self.returning_recipes(
+            'DELETE FROM {table} WHERE {user} = %s'
+            ' AND {recipe} IN (' + placeholders + ') RETURNING {recipe}',
+            [user.pk, *recipe_ids])
+
+    def returning_recipes(self, sql, params):
+        if len(params) < 2:
+            return []
+        meta = self.model._meta
+        sql = sql.format(
+            table=meta.db_table,
+            user=meta.get_field('user').column,
+            recipe=meta.get_field('recipe').column)
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(sql, params)
+            return [pk for pk, in cursor.fetchall()]
+
+
 class Tag(models.Model):
     """Модель Тэг"""
     name = models.CharField(
@@ -52,7 +168,7 @@ class Ingredient(models.Model):
         return f'Ингредиент {self.name[:CHARACTER_SLICE]}'
 
 
-class Recipe(models.Model):
+class Recipe(CounterFieldsMixin, models.Model):
     """Модель Рецепт"""
 
     author = models.ForeignKey(
@@ -71,6 +187,12 @@ class Recipe(models.Model):
         blank=True,
         null=True,
     )
+    image_variants = models.CharField(
+        max_length=100,
+        blank=True,
+        editable=False,
+        verbose_name='Картинка с готовыми копиями',
+    )
     text = models.TextField(
         verbose_name='Описание рецепта',
     )
@@ -91,11 +213,33 @@ class Recipe(models.Model):
         verbose_name='Дата публикации',
         auto_now_add=True,
     )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='В избранном',
+        default=0,
+        editable=False,
+    )
+    in_carts_count = models.PositiveIntegerField(
+        verbose_name='В списках покупок',
+        default=0,
+        editable=False,
+    )
+
+    objects = RecipeQuerySet.as_manager()
+    counter_fields = ('favorites_count', 'in_carts_count')
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ['-pub_date', ]
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'], name='recipe_pub_date_idx'),
+            models.Index(
+                fields=['author', '-pub_date'], name='recipe_author_date_idx'),
+            models.Index(
+                fields=['-favorites_count', '-pub_date', '-id'],
+                name='recipe_popular_idx'),
+        ]
 
     def __str__(self):
         return f'Рецепт {self.name}'
@@ -138,6 +282,8 @@ class Favorite(models.Model):
         verbose_name='Рецепт',
     )
 
+    objects = UserRecipeQuerySet.as_manager()
+
     class Meta:
         unique_together = ('user', 'recipe')
         ordering = ('user',)
@@ -159,6 +305,8 @@ class ShoppingCart(models.Model):
         verbose_name='Рецепт',
     )
 
+    objects = UserRecipeQuerySet.as_manager()
+
     class Meta:
         unique_together = ('user', 'recipe')
         verbose_name = 'Рецепт в списке покупок'
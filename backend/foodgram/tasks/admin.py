@@ -0,0 +1,11 @@
+from django.contrib import admin
+
+from .models import Task
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'status', 'attempts', 'created',
+                    'finished',)
+    list_filter = ('status', 'name',)
+    readonly_fields = ('started', 'finished', 'error',)
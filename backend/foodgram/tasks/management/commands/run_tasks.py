@@ -0,0 +1,61 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from tasks.queue import (claim_tasks, delete_done_tasks, requeue_stale_tasks,
+                         run_task)
+
+DEFAULT_WORKERS = 2
+DEFAULT_SLEEP = 1.0
+MAINTENANCE_INTERVAL = 60
+
+
+class Command(BaseCommand):
+    help = 'Обработчик фоновых задач на пуле процессов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=DEFAULT_WORKERS,
+            help='Количество процессов')
+        parser.add_argument(
+            '--sleep', type=float, default=DEFAULT_SLEEP,
+            help='Пауза в секундах, когда очередь пуста')
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить накопившиеся задачи и завершиться')
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        maintained = None
+        with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('fork')) as pool:
+            while True:
+                if (maintained is None
+                        or time.monotonic() - maintained
+                        >= MAINTENANCE_INTERVAL):
+                    self.maintain()
+                    maintained = time.monotonic()
+                ids = claim_tasks(workers)
+                if not ids:
+                    if options['once']:
+                        return
+                    time.sleep(options['sleep'])
+                    continue
+                # Дочерние процессы форкаются при отправке задач и не
+                # должны унаследовать открытые соединения с базой.
+                connections.close_all()
+                for pk, status in zip(ids, pool.map(run_task, ids)):
+                    self.stdout.write(f'Задача {pk}: {status}')
+
+    def maintain(self):
+        """Возврат зависших задач в очередь и удаление старых выполненных"""
+        requeued, failed = requeue_stale_tasks()
+        deleted = delete_done_tasks()
+        if requeued or failed or deleted:
+            self.stdout.write(
+                f'Зависших задач возвращено в очередь: {requeued}, '
+                f'failed: {failed}, удалено выполненных: {deleted}')
@@ -0,0 +1,120 @@
+import hashlib
+import json
+import logging
+import traceback
+from datetime import timedelta
+from functools import update_wrapper
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+
+class TaskFunction:
+    """Функция, которую можно поставить в очередь через delay()"""
+
+    def __init__(self, func, unique=False):
+        self.func = func
+        self.unique = unique
+        self.name = f'{func.__module__}.{func.__name__}'
+        update_wrapper(self, func)
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        """Постановка в очередь. С unique=True повторная задача с теми же
+        аргументами не создаётся, пока прежняя ждёт выполнения.
+        При TASKS_ALWAYS_EAGER функция выполняется сразу, а ошибка,
+        как и в обработчике, только логируется."""
+        if settings.TASKS_ALWAYS_EAGER:
+            try:
+                self.func(*args, **kwargs)
+            except Exception:
+                logger.exception('Ошибка задачи %s', self.name)
+            return None
+        payload = {'args': list(args), 'kwargs': kwargs}
+        key = hashlib.sha1(json.dumps(
+            [self.name, payload], sort_keys=True).encode()).hexdigest()
+        if self.unique:
+            task = Task.objects.filter(key=key, status=Task.PENDING).first()
+            if task is not None:
+                return task
+        return Task.objects.create(name=self.name, payload=payload, key=key)
+
+
+def task(func=None, *, unique=False):
+    """Декоратор фоновой задачи: @task или @task(unique=True)"""
+    if func is None:
+        return lambda func: TaskFunction(func, unique=unique)
+    return TaskFunction(func, unique=unique)
+
+
+def claim_tasks(limit):
+    """Забирает из очереди до limit задач и помечает их выполняемыми.
+    Попытка засчитывается сразу, чтобы её не потерял упавший обработчик."""
+    with transaction.atomic():
+        ids = list(
+            Task.objects
+            .select_for_update(skip_locked=True)
+            .filter(status=Task.PENDING)
+            .order_by('created')
+            .values_list('id', flat=True)[:limit]
+        )
+        Task.objects.filter(id__in=ids).update(
+            status=Task.RUNNING, started=timezone.now(),
+            attempts=F('attempts') + 1)
+    return ids
+
+
+def run_task(pk):
+    """Выполняет задачу. После ошибки задача возвращается в очередь,
+    пока не исчерпаны TASK_MAX_ATTEMPTS попыток."""
+    task = Task.objects.get(pk=pk)
+    try:
+        function = import_string(task.name)
+        function(*task.payload['args'], **task.payload['kwargs'])
+    except Exception:
+        task.error = traceback.format_exc()
+        task.status = (
+            Task.PENDING if task.attempts < settings.TASK_MAX_ATTEMPTS
+            else Task.FAILED)
+    else:
+        task.status = Task.DONE
+    task.finished = timezone.now()
+    task.save(update_fields=('status', 'error', 'finished'))
+    return task.status
+
+
+def requeue_stale_tasks(timeout=None):
+    """Задачи, которые выполняются дольше timeout секунд (обработчик
+    упал или был убит), возвращаются в очередь или, если попытки
+    исчерпаны, помечаются failed. Возвращает (в очереди, failed)."""
+    if timeout is None:
+        timeout = settings.TASK_TIMEOUT
+    stale = Task.objects.filter(
+        status=Task.RUNNING,
+        started__lt=timezone.now() - timedelta(seconds=timeout))
+    failed = stale.filter(
+        attempts__gte=settings.TASK_MAX_ATTEMPTS,
+    ).update(
+        status=Task.FAILED, finished=timezone.now(),
+        error=f'Не завершилась за {timeout} с')
+    return stale.update(status=Task.PENDING), failed
+
+
+def delete_done_tasks(days=None):
+    """Удаляет выполненные задачи старше days дней"""
+    if days is None:
+        days = settings.TASK_RETENTION_DAYS
+    deleted, _ = Task.objects.filter(
+        status=Task.DONE,
+        created__lt=timezone.now() - timedelta(days=days),
+    ).delete()
+    return deleted
@@ -0,0 +1,51 @@
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .models import Task
+from .queue import (claim_tasks, delete_done_tasks, requeue_stale_tasks,
+                    run_task, task)
+
+
+@task
+def failing():
+    raise ValueError('ошибка')
+
+
+@override_settings(TASKS_ALWAYS_EAGER=False, TASK_MAX_ATTEMPTS=2,
+                   TASK_TIMEOUT=60, TASK_RETENTION_DAYS=7)
+class QueueTest(TestCase):
+    """Повторы, зависшие и выполненные задачи"""
+
+    def test_failed_task_is_retried(self):
+        pk = failing.delay().pk
+        for status in (Task.PENDING, Task.FAILED):
+            self.assertEqual(claim_tasks(1), [pk])
+            self.assertEqual(run_task(pk), status)
+        self.assertEqual(claim_tasks(1), [])
+        task = Task.objects.get(pk=pk)
+        self.assertEqual(task.attempts, 2)
+        self.assertIn('ValueError', task.error)
+
+    def test_stale_task_is_requeued(self):
+        pk = failing.delay().pk
+        claim_tasks(1)
+        self.assertEqual(requeue_stale_tasks(), (0, 0))
+        Task.objects.filter(pk=pk).update(
+            started=timezone.now() - timedelta(minutes=2))
+        self.assertEqual(requeue_stale_tasks(), (1, 0))
+        self.assertEqual(claim_tasks(1), [pk])
+        Task.objects.filter(pk=pk).update(
+            started=timezone.now() - timedelta(minutes=2))
+        self.assertEqual(requeue_stale_tasks(), (0, 1))
+        self.assertEqual(Task.objects.get(pk=pk).status, Task.FAILED)
+
+    def test_old_done_tasks_are_deleted(self):
+        old, new, failed = (failing.delay() for _ in range(3))
+        Task.objects.filter(pk__in=(old.pk, new.pk)).update(status=Task.DONE)
+        Task.objects.filter(pk__in=(old.pk, failed.pk)).update(
+            created=timezone.now() - timedelta(days=8))
+        self.assertEqual(delete_done_tasks(), 1)
+        self.assertCountEqual(
+            Task.objects.values_list('pk', flat=True), (new.pk, failed.pk))
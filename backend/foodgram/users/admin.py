@@ -13,7 +13,9 @@ class UserAdmin(admin.ModelAdmin):
         'last_name',
         'email',
         'password',
-        'is_blocked'
+        'is_blocked',
+        'recipes_count',
+        'followers_count',
     ]
     ordering = ('id',)
     list_editable = ('password', )
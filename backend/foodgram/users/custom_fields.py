@@ -3,12 +3,21 @@ from rest_framework import serializers
 from .models import Follow
 
 
-class IsSubscribedField(serializers.Field):
-    def to_representation(self, obj):
-        request = self.context.get('request')
-        return Follow.objects.filter(user=request.user, author=obj).exists()
+def get_subscriptions(request):
+    """Id авторов, на которых подписан пользователь запроса.
+    Вычисляется одним запросом и кешируется на время запроса."""
+    subscriptions = getattr(request, '_subscriptions', None)
+    if subscriptions is None:
+        subscriptions = set()
+        if request.user.is_authenticated:
+            subscriptions = set(Follow.objects.filter(
+                user=request.user).values_list('author_id', flat=True))
+        request._subscriptions = subscriptions
+    return subscriptions
 
 
-class RecipeCount(serializers.Field):
+class IsSubscribedField(serializers.Field):
     def to_representation(self, obj):
-        return obj.recipes.count()
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
+        return obj.pk in get_subscriptions(self.context.get('request'))
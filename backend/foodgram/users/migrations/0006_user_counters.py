@@ -0,0 +1,44 @@
+# Generated by Django 3.2.18 on 2026-10-18 03:10
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_counters(apps, schema_editor):
+    User = apps.get_model('users', 'User')
+
+    def count(app_label, model_name):
+        model = apps.get_model(app_label, model_name)
+        return Coalesce(Subquery(
+            model.objects.filter(author=OuterRef('pk'))
+            .order_by().values('author')
+            .annotate(total=Count('pk')).values('total'),
+            output_field=models.PositiveIntegerField()), 0)
+
+    User.objects.update(
+        recipes_count=count('recipes', 'Recipe'),
+        followers_count=count('users', 'Follow'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0012_recipe_counters'),
+        ('users', '0005_auto_20261018_0252'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='followers_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Подписчиков'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='recipes_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Рецептов'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -1,10 +1,50 @@
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager
 from django.db import models
+from django.db.models.functions import Coalesce
 
 from foodgram.settings import AUTH_USER_MODEL
+from recipes.models import CounterFieldsMixin, Recipe
 
 
-class User(AbstractUser):
+class UserQuerySet(models.QuerySet):
+    """Кверисет Пользователя с аннотациями для сериализации"""
+
+    def with_is_subscribed(self, user):
+        """Аннотирует is_subscribed: подписан ли user на пользователя."""
+        if not user.is_authenticated:
+            return self.annotate(is_subscribed=models.Value(
+                False, output_field=models.BooleanField()))
+        return self.annotate(is_subscribed=models.Exists(
+            Follow.objects.filter(user=user, author=models.OuterRef('pk'))))
+
+    def change_counter(self, field, delta):
+        """Атомарно меняет счётчик на delta одним UPDATE с F().
+        Счётчик не уходит ниже нуля."""
+        queryset = self
+        if delta < 0:
+            queryset = queryset.filter(**{f'{field}__gte': -delta})
+        return queryset.update(**{field: models.F(field) + delta})
+
+    def recalculate_counters(self):
+        """Пересчитывает recipes_count и followers_count одним UPDATE
+        с подзапросами COUNT"""
+        def count(model, field):
+            return Coalesce(models.Subquery(
+                model.objects.filter(**{field: models.OuterRef('pk')})
+                .order_by().values(field)
+                .annotate(total=models.Count('pk')).values('total'),
+                output_field=models.PositiveIntegerField()), 0)
+        return self.update(
+            recipes_count=count(Recipe, 'author'),
+            followers_count=count(Follow, 'author'),
+        )
+
+
+class FoodgramUserManager(UserManager.from_queryset(UserQuerySet)):
+    pass
+
+
+class User(CounterFieldsMixin, AbstractUser):
 
     email = models.EmailField(
         'E-mail address',
@@ -30,6 +70,19 @@ class User(AbstractUser):
     )
     is_blocked = models.BooleanField(
         default=False, verbose_name='Блокировка')
+    recipes_count = models.PositiveIntegerField(
+        'Рецептов',
+        default=0,
+        editable=False,
+    )
+    followers_count = models.PositiveIntegerField(
+        'Подписчиков',
+        default=0,
+        editable=False,
+    )
+
+    objects = FoodgramUserManager()
+    counter_fields = ('recipes_count', 'followers_count')
 
     class Meta:
         ordering = ('username',)
@@ -1,3 +1,4 @@
+from django.conf import settings
 from rest_framework import permissions
 
 
@@ -17,3 +18,8 @@ class AuthUser(permissions.BasePermission):
 
     def has_object_permission(self, request, view, obj):
         return request.user == obj.author and not request.user.is_blocked
+
+
+class MetricsAllowlist(permissions.BasePermission):
+    def has_permission(self, request, view):
+        return request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS
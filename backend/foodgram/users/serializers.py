@@ -1,10 +1,11 @@
 from rest_framework import serializers
 
 from api.custom_fields import Base64ImageField
+from api.images import THUMBNAIL
 
 from recipes.models import Recipe
 
-from .custom_fields import IsSubscribedField, RecipeCount
+from .custom_fields import IsSubscribedField
 from .models import User
 from .validators import (
     email_validation,
@@ -37,6 +38,8 @@ class UserSerializer(serializers.ModelSerializer):
             'first_name',
             'last_name',
             'is_subscribed',
+            'recipes_count',
+            'followers_count',
         )
 
     def get_fields(self):
@@ -130,7 +133,7 @@ class RecipeForFlollowSerializer(serializers.ModelSerializer):
     '''Сериалайзер для отображения рецепта при запросах
        связаных с подпиской'''
     name = serializers.ReadOnlyField()
-    image = Base64ImageField(read_only=True)
+    image = Base64ImageField(variant=THUMBNAIL, read_only=True)
     cooking_time = serializers.ReadOnlyField()
 
     class Meta:
@@ -143,14 +146,13 @@ class FollowReadSerializer(serializers.ModelSerializer):
     '''Сериалайзер для GET-запросов к модели Подписка'''
     is_subscribed = IsSubscribedField(source='*')
     recipes = RecipeForFlollowSerializer(many=True, read_only=True)
-    recipes_count = RecipeCount(source='*')
 
     class Meta:
         model = User
         fields = ('email', 'id',
                   'username', 'first_name',
                   'last_name', 'is_subscribed',
-                  'recipes', 'recipes_count')
+                  'recipes', 'recipes_count', 'followers_count')
 
 
 class FollowWriteSerializer(serializers.ModelSerializer):
@@ -159,7 +161,6 @@ class FollowWriteSerializer(serializers.ModelSerializer):
     username = serializers.ReadOnlyField()
     is_subscribed = IsSubscribedField(source='*', required=False)
     recipes = RecipeForFlollowSerializer(many=True, read_only=True)
-    recipes_count = RecipeCount(source='*', required=False)
     first_name = serializers.CharField(read_only=True)
     last_name = serializers.CharField(read_only=True)
 
@@ -168,7 +169,7 @@ class FollowWriteSerializer(serializers.ModelSerializer):
         fields = ('email', 'id',
                   'username', 'first_name',
                   'last_name', 'is_subscribed',
-                  'recipes', 'recipes_count')
+                  'recipes', 'recipes_count', 'followers_count')
 
     def validate(self, attrs):
         if self.instance.following.filter(
@@ -1,4 +1,5 @@
 from django.contrib.auth.hashers import make_password
+from django.db.models import Prefetch
 from django.shortcuts import get_object_or_404
 
 from rest_framework import filters, status, viewsets
@@ -6,6 +7,8 @@ from rest_framework.decorators import action
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 
+from recipes.models import Recipe
+
 from .models import Follow, User
 from .permissions import Admin, AuthUser, Guest
 from .serializers import (FollowReadSerializer, FollowWriteSerializer,
@@ -31,6 +34,11 @@ class UserViewSet(viewsets.ModelViewSet):
     filter_backends = (filters.SearchFilter,)
     search_fields = ('username',)
 
+    def get_queryset(self):
+        if self.action in ['list', 'retrieve']:
+            return User.objects.with_is_subscribed(self.request.user)
+        return super().get_queryset()
+
     def get_permissions(self):
         """Получение прав для разных action."""
         try:
@@ -84,7 +92,17 @@ class UserViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def subscriptions(self, request):
-        queryset = User.objects.filter(following__user=request.user)
+        recipes = Recipe.objects.all()
+        recipes_limit = request.query_params.get('recipes_limit')
+        if recipes_limit and recipes_limit.isdigit():
+            recipes = recipes.latest_per_author(int(recipes_limit))
+        queryset = (
+            User.objects
+            .filter(following__user=request.user)
+            .with_is_subscribed(request.user)
+            .prefetch_related(Prefetch('recipes', queryset=recipes))
+            .order_by('username')
+        )
         page = self.paginate_queryset(queryset)
         serializer = FollowReadSerializer(
             page, many=True, context={'request': request})
@@ -103,6 +121,7 @@ class UserViewSet(viewsets.ModelViewSet):
                 author, data=request.data, context={'request': request})
             serializer.is_valid(raise_exception=True)
             Follow.objects.create(user=user, author=author)
+            author.refresh_from_db(fields=('followers_count',))
             return Response(serializer.data,
                             status=status.HTTP_201_CREATED)
 